@@ -1,92 +1,256 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from datetime import date, datetime
+from decimal import Decimal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+from typing import Callable, Iterator, List, Optional
 
-from app.db import models
-from app.db.database import get_db
+from app.db import account_state, models, outbox, snapshots, statements
+from app.db.database import get_async_db
 from app.schemas import account as account_schema
-from app.api.auth import get_current_user, get_current_admin
+from app.schemas.auth import TokenData
+from app.api.auth import get_current_user, get_current_admin, get_read_db, rate_limited
+from app.api import export, fastjson
+from app.core.instrumentation import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute, dependencies=[Depends(rate_limited("accounts"))])
+
+ACCOUNT_TOGGLE_ATTEMPTS = 3
+
+def _account_payload(account: models.Account) -> dict:
+    payload = account_schema.Account.model_validate(account).model_dump(mode="json")
+    return {**payload, "balance": outbox.money(account.balance)}
+
+# Account rows are versioned, so an edit that races another edit of the same account
+# fails its UPDATE with StaleDataError and the client gets a 409. Postings don't bump
+# the version; they only move the balance, which edits can't set. `attempts` > 1
+# re-applies the change to a fresh copy, for changes that are relative to the current
+# row rather than a client's view of it.
+async def _update_account(
+    db: AsyncSession, account_id: int, change: Callable[[models.Account], None], attempts: int = 1
+) -> models.Account:
+    for _ in range(attempts):
+        account = await db.get(models.Account, account_id)
+        if not account:
+            raise HTTPException(status_code=404, detail="Account not found")
+
+        change(account)
+        await db.run_sync(outbox.record, "account.updated", account_id, _account_payload(account))
+        try:
+            await db.commit()
+        except StaleDataError:
+            await db.rollback()
+            continue
+        account_state.invalidate(account_id)
+        await db.refresh(account)
+        return account
+    raise HTTPException(status_code=409, detail="Account was modified concurrently, please retry")
 
 @router.post("/accounts", response_model=account_schema.Account)
-def create_account(
+async def create_account(
     account_data: account_schema.AccountCreate,
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_admin)
 ):
-    if db.query(models.Account).filter(models.Account.email == account_data.email).first():
+    if await db.scalar(select(models.Account.id).where(models.Account.email == account_data.email)):
         raise HTTPException(status_code=400, detail="Email already exists")
-    if db.query(models.Account).filter(models.Account.PID == account_data.PID).first():
+    if await db.scalar(select(models.Account.id).where(models.Account.PID == account_data.PID)):
         raise HTTPException(status_code=400, detail="PID already exists")
 
     account = models.Account(**account_data.model_dump())
     db.add(account)
-    db.commit()
-    db.refresh(account)
+    await db.flush()
+    await db.run_sync(outbox.record, "account.created", account.id, _account_payload(account))
+    await db.commit()
+    await db.refresh(account)
     return account
 
 @router.put("/accounts/{account_id}", response_model=account_schema.Account)
-def update_account(
+async def update_account(
     account_id: int,
     updates: account_schema.AccountUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_user)
 ):
-    account = db.query(models.Account).filter(models.Account.id == account_id).first()
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-
-    for key, value in updates.model_dump(exclude_unset=True).items():
-        setattr(account, key, value)
+    def apply(account: models.Account):
+        for key, value in updates.model_dump(exclude_unset=True).items():
+            setattr(account, key, value)
 
-    db.commit()
-    db.refresh(account)
-    return account
+    return await _update_account(db, account_id, apply)
 
 @router.get("/accounts", response_model=List[account_schema.Account])
-def get_all_accounts(
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_user)
+async def get_all_accounts(
+    is_active: Optional[bool] = Query(None),
+    min_balance: Optional[Decimal] = Query(None, description="Minimum balance (inclusive)"),
+    max_balance: Optional[Decimal] = Query(None, description="Maximum balance (inclusive)"),
+    created_from: Optional[datetime] = Query(None, description="Created on or after"),
+    created_to: Optional[datetime] = Query(None, description="Created on or before"),
+    sort: str = Query("id", pattern="^-?(id|balance|created_on)$", description="Sort key, prefix with - for descending"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,balance"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: TokenData = Depends(get_current_user)
 ):
-    return db.query(models.Account).all()
+    try:
+        columns = fastjson.projection(account_schema.Account, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    query = select(*fastjson.schema_columns(account_schema.Account, models.Account, columns))
+    if is_active is not None:
+        query = query.where(models.Account.is_active.is_(is_active))
+    if min_balance is not None:
+        query = query.where(models.Account.balance >= min_balance)
+    if max_balance is not None:
+        query = query.where(models.Account.balance <= max_balance)
+    if created_from is not None:
+        query = query.where(models.Account.created_on >= created_from)
+    if created_to is not None:
+        query = query.where(models.Account.created_on <= created_to)
+
+    result = await (await db.connection()).execute(query.order_by(*fastjson.order_by(models.Account, sort)))
+    return fastjson.rows_response(result.keys(), result)
+
+# Declared ahead of /accounts/{account_id} so the path is not parsed as an id.
+@router.get("/accounts/daily-totals", response_model=account_schema.BankDailyTotals)
+async def get_bank_daily_totals(
+    day: date = Query(..., description="Closed UTC day with a balance snapshot"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: TokenData = Depends(get_current_user)
+):
+    totals = await db.run_sync(snapshots.bank_totals, day)
+    if totals is None:
+        raise HTTPException(status_code=404, detail=f"No balance snapshot for {day}")
+    return totals
 
 @router.get("/accounts/{account_id}", response_model=account_schema.Account)
-def get_account_by_id(
+async def get_account_by_id(
     account_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: TokenData = Depends(get_current_user)
 ):
-    account = db.query(models.Account).filter(models.Account.id == account_id).first()
+    account = await db.get(models.Account, account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
     return account
 
-@router.patch("/accounts/{account_id}/toggle-active", response_model=account_schema.Account)
-def toggle_account_active_status(
+@router.get("/accounts/{account_id}/summary", response_model=account_schema.AccountSummary)
+async def get_account_summary(
     account_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: TokenData = Depends(get_current_user)
 ):
-    account = db.query(models.Account).filter(models.Account.id == account_id).first()
-    if not account:
+    summary = await db.get(models.AccountLedgerSummary, account_id)
+    if summary is not None:
+        return summary
+    if not await db.scalar(select(models.Account.id).where(models.Account.id == account_id)):
         raise HTTPException(status_code=404, detail="Account not found")
+    return account_schema.AccountSummary(account_id=account_id)
 
-    account.is_active = not account.is_active
-    db.commit()
-    db.refresh(account)
-    return account
+@router.get("/accounts/{account_id}/balance", response_model=account_schema.AccountBalance)
+async def get_account_balance(
+    account_id: int,
+    as_of: datetime = Query(..., description="Balance before any transaction at or after this instant"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: TokenData = Depends(get_current_user)
+):
+    account = (await db.execute(
+        select(models.Account.id, models.Account.created_on).where(models.Account.id == account_id)
+    )).first()
+    if account is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    if snapshots.naive_utc(as_of) <= snapshots.naive_utc(account.created_on):
+        balance, snapshot_day = Decimal("0"), None
+    else:
+        balance, snapshot_day = await db.run_sync(snapshots.balance_as_of, account_id, as_of)
+    return account_schema.AccountBalance(account_id=account_id, as_of=as_of, balance=balance, snapshot_day=snapshot_day)
+
+def _statement_parquet_schema():
+    import pyarrow as pa
+
+    money = pa.decimal128(18, 2)
+    return pa.schema([
+        ("id", pa.int64()), ("timestamp", pa.timestamp("us")), ("type", pa.string()),
+        ("sender_id", pa.int64()), ("recv_id", pa.int64()), ("amount", money), ("balance", money),
+    ])
+
+
+# The statement pipeline is synchronous; each step runs through run_sync, so its
+# queries go over the session's async connection one chunk at a time.
+async def _stream_statement(db: AsyncSession, body: Iterator[bytes]):
+    try:
+        while (data := await db.run_sync(lambda _: next(body, None))) is not None:
+            yield data
+    finally:
+        await db.close()
+
+
+@router.get(
+    "/accounts/{account_id}/statement",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"text/csv": {}, "application/vnd.apache.parquet": {}}}},
+)
+async def get_account_statement(
+    account_id: int,
+    start: datetime = Query(..., description="Start of the statement period (inclusive)"),
+    end: datetime = Query(..., description="End of the statement period (inclusive)"),
+    output_format: str = Query("csv", alias="format", pattern="^(csv|parquet)$"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: TokenData = Depends(get_current_user)
+):
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if output_format == "parquet" and not export.parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export is not available on this server")
+    if not await db.scalar(select(models.Account.id).where(models.Account.id == account_id)):
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    # The request session is closed before the body streams, so the statement reads go
+    # through a session of their own that holds one snapshot until the last row.
+    statement_db = AsyncSession(db.bind, info=db.info)
+    try:
+        await statement_db.run_sync(statements.begin_snapshot)
+        opening = await statement_db.run_sync(statements.opening_balance, account_id, start)
+        chunks = await statement_db.run_sync(statements.statement_chunks, account_id, start, end, opening)
+    except BaseException:
+        await statement_db.close()
+        raise
+    if output_format == "parquet":
+        body = export.parquet_stream(_statement_parquet_schema(), chunks)
+    else:
+        body = export.csv_stream(statements.COLUMNS, chunks)
+    media_type = "application/vnd.apache.parquet" if output_format == "parquet" else "text/csv"
+    headers = {
+        "X-Opening-Balance": str(opening),
+        "Content-Disposition": f'attachment; filename="statement-{account_id}.{output_format}"',
+    }
+    return StreamingResponse(_stream_statement(statement_db, body), media_type=media_type, headers=headers)
+
+@router.patch("/accounts/{account_id}/toggle-active", response_model=account_schema.Account)
+async def toggle_account_active_status(
+    account_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_admin)
+):
+    def toggle(account: models.Account):
+        account.is_active = not account.is_active
+
+    return await _update_account(db, account_id, toggle, ACCOUNT_TOGGLE_ATTEMPTS)
 
 @router.delete("/accounts/{account_id}", status_code=204)
-def delete_account(
+async def delete_account(
     account_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_admin)
 ):
-    account = db.query(models.Account).filter(models.Account.id == account_id).first()
+    account = await db.get(models.Account, account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
-    db.delete(account)
-    db.commit()
+    await db.delete(account)
+    await db.run_sync(outbox.record, "account.deleted", account_id, {"id": account_id})
+    await db.commit()
+    account_state.invalidate(account_id)
     return
@@ -1,24 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import hashlib
+import hmac
+import math
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from jose import JWTError, jwt
 
 from app.db import models 
-from app.db.database import get_db
+from app.db.database import get_async_db, has_replica, read_session, request_commits
 from app.schemas import auth
-from app.core import security
+from app.core import ratelimit, security
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.instrumentation import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# token -> TokenData snapshot, bounded by the token's own expiry
+user_cache = TTLCache(settings.AUTH_CACHE_MAX_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
+
+def invalidate_user(employee_id: int):
+    user_cache.discard_where(lambda user: user.id == employee_id)
+
 @router.post("/auth/login", response_model=auth.Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = db.query(models.Employee).filter(models.Employee.email == form_data.username).first()
-    if not user or not security.verify_password(form_data.password, user.password_hash):
+    user = await db.scalar(select(models.Employee).where(models.Employee.email == form_data.username))
+    if not user or not await security.verify_password_async(form_data.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     token_data = {"id": user.id, "role": user.role}
@@ -26,10 +39,14 @@ def login(
 
     return {"access_token": token, "token_type": "bearer"}
 
-def get_current_user(
+async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> models.Employee:
+    db: AsyncSession = Depends(get_async_db)
+) -> auth.TokenData:
+    cached = user_cache.get(token)
+    if cached is not None:
+        return cached
+
     credentials_exception = HTTPException(
         status_code=401,
         detail="Invalid authentication",
@@ -37,20 +54,84 @@ def get_current_user(
     )
 
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = security.decode_access_token(token)
         user_id = int(payload.get("id") or -1)
         if user_id == -1:
             raise credentials_exception
-    except JWTError:
+    except security.InvalidToken:
         raise credentials_exception
 
-    user = db.query(models.Employee).filter(models.Employee.id == user_id).first()
-    if user is None:
+    employee = (await db.execute(
+        select(models.Employee.id, models.Employee.role).where(models.Employee.id == user_id)
+    )).first()
+    if employee is None:
         raise HTTPException(status_code=404, detail="User not found")
 
+    user = auth.TokenData(id=employee.id, role=employee.role)
+    user_cache.set(token, user, ttl=payload["exp"] - time.time())
     return user
 
-def get_current_admin(current_user: models.Employee = Depends(get_current_user)):
+LAST_WRITE_COOKIE = "bankbase_last_write"
+
+# The cookie is "<commit time>.<signature>", so a client can't forge a time that would
+# pin it to the primary.
+def _sign(stamp: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), stamp.encode(), hashlib.sha256).hexdigest()
+
+def _last_write_cookie(last_write: float) -> str:
+    stamp = f"{last_write:.3f}"
+    return f"{stamp}.{_sign(stamp)}"
+
+def _last_write(request: Request) -> Optional[float]:
+    stamp, _, signature = request.cookies.get(LAST_WRITE_COOKIE, "").rpartition(".")
+    if not stamp or not hmac.compare_digest(signature, _sign(stamp)):
+        return None
+    try:
+        return float(stamp)
+    except ValueError:
+        return None
+
+# GET handlers read from the replica, except for a client whose last write is less than
+# READ_AFTER_WRITE_SECONDS old, which stays on the primary to see its own changes.
+async def get_read_db(request: Request, current_user: auth.TokenData = Depends(get_current_user)):
+    async with read_session(_last_write(request)) as db:
+        yield db
+
+# Stamps responses to requests that committed on the primary with the commit time. The
+# cookie expires with the read-after-write window, so stale stamps are never sent back.
+class ReadAfterWriteMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not has_replica():
+            await self.app(scope, receive, send)
+            return
+
+        commits = []
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and commits:
+                cookie = (
+                    f"{LAST_WRITE_COOKIE}={_last_write_cookie(commits[-1])}; Max-Age={math.ceil(settings.READ_AFTER_WRITE_SECONDS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", cookie.encode())]
+            await send(message)
+
+        token = request_commits.set(commits)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_commits.reset(token)
+
+# Router-level dependency: one token bucket per employee for each router's budget.
+def rate_limited(scope: str):
+    async def check_rate_limit(current_user: auth.TokenData = Depends(get_current_user)):
+        await ratelimit.acquire(scope, current_user.id)
+    return check_rate_limit
+
+async def get_current_admin(current_user: auth.TokenData = Depends(get_current_user)) -> auth.TokenData:
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
     return current_user
@@ -58,14 +139,19 @@ def get_current_admin(current_user: models.Employee = Depends(get_current_user))
 from app.schemas.auth import PasswordChangeRequest
 
 @router.post("/auth/change-password")
-def change_password(
+async def change_password(
     request: PasswordChangeRequest,
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: auth.TokenData = Depends(get_current_user)
 ):
-    if not security.verify_password(request.current_password, current_user.password_hash):
+    employee = await db.get(models.Employee, current_user.id)
+    if employee is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    if not await security.verify_password_async(request.current_password, employee.password_hash):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
 
-    current_user.password_hash = security.get_password_hash(request.new_password)
-    db.commit()
+    employee.password_hash = await security.get_password_hash_async(request.new_password)
+    await db.commit()
+    invalidate_user(employee.id)
     return {"detail": "Password updated successfully"}
@@ -1,28 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
 from app.db import models
-from app.db.database import get_db
+from app.db.database import get_async_db
 from app.schemas import employee as employee_schema
-from app.api.auth import get_current_user, get_current_admin
+from app.schemas.auth import TokenData
+from app.api.auth import get_current_user, get_current_admin, get_read_db, invalidate_user, rate_limited
+from app.api import fastjson
 from app.core import security
+from app.core.instrumentation import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute, dependencies=[Depends(rate_limited("employees"))])
 
 @router.post("/employees", response_model=employee_schema.Employee)
-def add_employee(
+async def add_employee(
     emp_data: employee_schema.EmployeeCreate,
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_admin)
 ):
-    if db.query(models.Employee).filter(models.Employee.email == emp_data.email).first():
+    if await db.scalar(select(models.Employee.id).where(models.Employee.email == emp_data.email)):
         raise HTTPException(status_code=400, detail="Email already exists")
     
-    if db.query(models.Employee).filter(models.Employee.phone == emp_data.phone).first():
+    if await db.scalar(select(models.Employee.id).where(models.Employee.phone == emp_data.phone)):
         raise HTTPException(status_code=400, detail="Phone already exists")
 
-    hashed_password = security.get_password_hash(emp_data.password)
+    hashed_password = await security.get_password_hash_async(emp_data.password)
 
     new_employee = models.Employee(
         name=emp_data.name,
@@ -32,61 +37,82 @@ def add_employee(
         role=emp_data.role or "clerk"
     )
     db.add(new_employee)
-    db.commit()
-    db.refresh(new_employee)
+    await db.commit()
+    await db.refresh(new_employee)
     return new_employee
 
 @router.patch("/employees/{employee_id}", response_model=employee_schema.Employee)
-def update_employee(
+async def update_employee(
     employee_id: int,
     updates: employee_schema.EmployeeUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_admin),
 ):
-    employee = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
+    employee = await db.get(models.Employee, employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
 
     for key, value in updates.model_dump(exclude_unset=True).items():
         setattr(employee, key, value)
 
-    db.commit()
-    db.refresh(employee)
+    await db.commit()
+    invalidate_user(employee_id)
+    await db.refresh(employee)
     return employee
 
 
 @router.get("/employees", response_model=List[employee_schema.Employee])
-def list_employees(
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_user)
+async def list_employees(
+    role: Optional[str] = Query(None),
+    joined_from: Optional[datetime] = Query(None, description="Joined on or after"),
+    joined_to: Optional[datetime] = Query(None, description="Joined on or before"),
+    sort: str = Query("id", pattern="^-?(id|name|joined_on)$", description="Sort key, prefix with - for descending"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,role"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: TokenData = Depends(get_current_user)
 ):
-    return db.query(models.Employee).all()
+    try:
+        columns = fastjson.projection(employee_schema.Employee, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    query = select(*fastjson.schema_columns(employee_schema.Employee, models.Employee, columns))
+    if role is not None:
+        query = query.where(models.Employee.role == role)
+    if joined_from is not None:
+        query = query.where(models.Employee.joined_on >= joined_from)
+    if joined_to is not None:
+        query = query.where(models.Employee.joined_on <= joined_to)
+
+    result = await (await db.connection()).execute(query.order_by(*fastjson.order_by(models.Employee, sort)))
+    return fastjson.rows_response(result.keys(), result)
 
 @router.get("/employees/{employee_id}", response_model=employee_schema.Employee)
-def get_employee(
+async def get_employee(
     employee_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: TokenData = Depends(get_current_user)
 ):
-    employee = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
+    employee = await db.get(models.Employee, employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
     return employee
 
 @router.delete("/employees/{employee_id}", status_code=204)
-def delete_employee(
+async def delete_employee(
     employee_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_admin)
 ):
     if current_user.id == employee_id:
         raise HTTPException(status_code=400, detail="You cannot delete your own account")
 
-    employee = db.query(models.Employee).filter(models.Employee.id == employee_id).first()
+    employee = await db.get(models.Employee, employee_id)
     if not employee:
         raise HTTPException(status_code=404, detail="Employee not found")
 
-    db.delete(employee)
-    db.commit()
+    await db.delete(employee)
+    await db.commit()
+    invalidate_user(employee_id)
     return
 
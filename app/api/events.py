@@ -0,0 +1,92 @@
+import asyncio
+import time
+from fastapi import APIRouter, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.db import outbox
+from app.db.database import get_async_db
+from app.schemas import event as event_schema
+from app.schemas.auth import TokenData
+from app.api.auth import get_current_user, rate_limited
+from app.core.config import settings
+from app.core.instrumentation import InstrumentedRoute
+
+router = APIRouter(route_class=InstrumentedRoute, dependencies=[Depends(rate_limited("events"))])
+
+TOPIC_PATTERN = "^(transaction|account)$"
+
+
+async def _fetch(db: AsyncSession, after: int, limit: int, topic: Optional[str]) -> list:
+    events = (await db.execute(outbox.events_after(after, limit, topic))).all()
+    # End the read transaction so the next poll sees newly committed events.
+    await db.rollback()
+    return events
+
+
+@router.get("/events", response_model=event_schema.EventBatch)
+async def read_events(
+    after: int = Query(0, ge=0, description="Offset of the last event already processed"),
+    limit: int = Query(100, ge=1, le=settings.PAGE_SIZE_MAX),
+    topic: Optional[str] = Query(None, pattern=TOPIC_PATTERN),
+    wait: float = Query(0, ge=0, le=settings.OUTBOX_MAX_WAIT_SECONDS, description="Seconds to wait for new events"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_user)
+):
+    deadline = time.monotonic() + wait
+    while True:
+        events = await _fetch(db, after, limit, topic)
+        remaining = deadline - time.monotonic()
+        if events or remaining <= 0:
+            break
+        await asyncio.sleep(min(settings.OUTBOX_POLL_INTERVAL_SECONDS, remaining))
+    return {"events": events, "next_offset": events[-1].id if events else after}
+
+
+def _sse_frames(events: list) -> bytes:
+    return b"".join(
+        b"id: %d\nevent: %s\ndata: %s\n\n" % (
+            event.id, event.type.encode(),
+            to_json(event_schema.Event.model_validate(event).model_dump(mode="json")),
+        )
+        for event in events
+    )
+
+
+async def _stream_events(request: Request, db: AsyncSession, after: int, limit: int, topic: Optional[str]):
+    idle = 0.0
+    try:
+        while not await request.is_disconnected():
+            events = await _fetch(db, after, limit, topic)
+            if events:
+                after = events[-1].id
+                idle = 0.0
+                yield _sse_frames(events)
+                continue
+            if idle >= settings.OUTBOX_MAX_WAIT_SECONDS:
+                idle = 0.0
+                yield b": keep-alive\n\n"
+            await asyncio.sleep(settings.OUTBOX_POLL_INTERVAL_SECONDS)
+            idle += settings.OUTBOX_POLL_INTERVAL_SECONDS
+    finally:
+        await db.close()
+
+
+@router.get("/events/stream", response_class=StreamingResponse)
+async def stream_events(
+    request: Request,
+    after: int = Query(0, ge=0, description="Offset to resume from; Last-Event-ID takes precedence"),
+    limit: int = Query(100, ge=1, le=settings.PAGE_SIZE_MAX, description="Maximum events per batch"),
+    topic: Optional[str] = Query(None, pattern=TOPIC_PATTERN),
+    last_event_id: Optional[int] = Header(None, alias="Last-Event-ID", ge=0),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_user)
+):
+    offset = after if last_event_id is None else last_event_id
+    return StreamingResponse(
+        _stream_events(request, db, offset, limit, topic),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
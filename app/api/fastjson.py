@@ -0,0 +1,53 @@
+from typing import Iterable, Optional, Sequence
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy import BigInteger, type_coerce
+
+from app.core.instrumentation import record_rows
+from app.db.types import Money
+
+
+# Selects exactly the schema's fields as labelled columns, so rows can be encoded
+# without loading ORM entities or validating each one through the schema.
+def schema_columns(schema: type[BaseModel], model, fields: Optional[Sequence[str]] = None) -> list:
+    columns = []
+    for name in fields or schema.model_fields:
+        column = getattr(model, name)
+        if isinstance(column.type, Money):
+            column = type_coerce(column, BigInteger) / 100.0
+        columns.append(column.label(name))
+    return columns
+
+
+def projection(schema: type[BaseModel], fields: Optional[str]) -> Optional[list[str]]:
+    if not fields:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in schema.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+
+# "balance" or "-balance"; id breaks ties in the same direction so pages are stable.
+def order_by(model, sort: str) -> list:
+    descending, name = sort.startswith("-"), sort.lstrip("-")
+    columns = [getattr(model, name)] if name == "id" else [getattr(model, name), model.id]
+    return [column.desc() if descending else column.asc() for column in columns]
+
+
+def encode_rows(keys: Sequence[str], rows: Iterable) -> bytes:
+    items = [dict(zip(keys, row)) for row in rows]
+    record_rows(len(items))
+    return to_json(items)
+
+
+def encode_ndjson(keys: Sequence[str], rows: Iterable) -> bytes:
+    lines = [to_json(dict(zip(keys, row))) + b"\n" for row in rows]
+    record_rows(len(lines))
+    return b"".join(lines)
+
+
+def rows_response(keys: Iterable[str], rows: Iterable, headers: Optional[dict] = None) -> Response:
+    return Response(content=encode_rows(list(keys), rows), media_type="application/json", headers=headers)
@@ -1,92 +1,256 @@
-from fastapi import APIRouter, Depends, HTTPException, Path, Query
+import json
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from app.db import models
-from app.db.database import get_db
+from app.db.database import get_async_db
+from app.db import idempotency, partitions, posting
 from app.schemas import transaction as transaction_schema
-from app.api.auth import get_current_user
+from app.schemas.auth import TokenData
+from app.api.auth import get_current_user, get_read_db, rate_limited
+from app.api import fastjson
+from app.core.config import settings
+from app.core.pagination import encode_cursor, decode_cursor
+from app.core.instrumentation import InstrumentedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=InstrumentedRoute, dependencies=[Depends(rate_limited("transactions"))])
 
 
-@router.post("/transactions", response_model=transaction_schema.Transaction)
-def create_transaction(
-    tx: transaction_schema.TransactionCreate,
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_user)
-):
+def _validation_error(tx: transaction_schema.TransactionCreate) -> Optional[str]:
     if tx.amount <= 0:
-        raise HTTPException(status_code=400, detail="Amount must be positive")
+        return "Amount must be positive"
 
     if tx.type == transaction_schema.TransactionType.deposit:
         if tx.sender_id is not None or tx.recv_id is None:
-            raise HTTPException(status_code=400, detail="Deposit must have recv_id only")
+            return "Deposit must have recv_id only"
     elif tx.type == transaction_schema.TransactionType.withdrawal:
         if tx.sender_id is None or tx.recv_id is not None:
-            raise HTTPException(status_code=400, detail="Withdrawal must have sender_id only")
+            return "Withdrawal must have sender_id only"
     elif tx.type == transaction_schema.TransactionType.transfer:
         if not tx.sender_id or not tx.recv_id:
-            raise HTTPException(status_code=400, detail="Transfer must have both sender_id and recv_id")
+            return "Transfer must have both sender_id and recv_id"
     elif tx.type == transaction_schema.TransactionType.reversal:
-        raise HTTPException(status_code=400, detail="You cannot create a reversal directly")
+        return "You cannot create a reversal directly"
+    return None
+
+
+def _post_transaction(db: Session, tx: transaction_schema.TransactionCreate) -> models.Transaction:
+    error = _validation_error(tx)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+
+    try:
+        return posting.post_transaction(
+            db, tx.sender_id, tx.recv_id, tx.amount, models.TransactionType(tx.type.value)
+        )
+    except posting.PostingError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+def _post_idempotent(
+    db: Session, tx: transaction_schema.TransactionCreate, employee_id: int, key: str, request_fingerprint: str
+) -> tuple[idempotency.StoredResponse, bool]:
+    try:
+        transaction = _post_transaction(db, tx)
+    except HTTPException as e:
+        db.rollback()
+        stored = idempotency.StoredResponse(request_fingerprint, e.status_code, {"detail": e.detail})
+    else:
+        body = transaction_schema.Transaction.model_validate(transaction).model_dump(mode="json")
+        stored = idempotency.StoredResponse(request_fingerprint, 200, body)
+
+    idempotency.store(db, employee_id, key, stored)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker committed the same key first; its posting stands and ours is discarded.
+        db.rollback()
+        winner = idempotency.lookup(db, employee_id, key)
+        if winner is None:
+            raise
+        return winner, True
+    idempotency.remember(employee_id, key, stored)
+    return stored, False
+
+
+@router.post("/transactions", response_model=transaction_schema.Transaction)
+async def create_transaction(
+    tx: transaction_schema.TransactionCreate,
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key", min_length=1, max_length=255,
+        description="Retries with the same key return the first response instead of posting again"
+    ),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_user)
+):
+    if idempotency_key is None:
+        transaction = await db.run_sync(_post_transaction, tx)
+        await db.commit()
+        await db.refresh(transaction)
+        return transaction
+
+    request_fingerprint = idempotency.fingerprint(tx.model_dump_json().encode())
+    async with idempotency.key_lock(current_user.id, idempotency_key):
+        stored = await db.run_sync(idempotency.lookup, current_user.id, idempotency_key)
+        replayed = stored is not None
+        if not replayed:
+            stored, replayed = await db.run_sync(
+                _post_idempotent, tx, current_user.id, idempotency_key, request_fingerprint
+            )
+
+    if stored.fingerprint != request_fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    headers = {"Idempotent-Replayed": "true"} if replayed else None
+    return JSONResponse(content=stored.body, status_code=stored.status_code, headers=headers)
+
+
+async def _read_batch_rows(request: Request):
+    if "ndjson" in request.headers.get("content-type", ""):
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+        return
+
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    for row in rows:
+        yield row
+
+
+@router.post(
+    "/transactions/batch",
+    response_model=transaction_schema.BatchResult,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": {"type": "array", "items": {"$ref": "#/components/schemas/TransactionCreate"}}},
+        "application/x-ndjson": {"schema": {"$ref": "#/components/schemas/TransactionCreate"}},
+    }}},
+)
+async def create_transactions_batch(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_user)
+):
+    rows = []
+    pending = []
+
+    # Each chunk is posted and committed as soon as it has been parsed, so neither the
+    # parsed rows nor a write transaction are held while the rest of the body arrives.
+    async def post_pending():
+        for row_index, transaction_id, error in await db.run_sync(posting.post_batch, pending):
+            if error:
+                rows[row_index] = {"index": row_index, "status_code": error.status_code, "detail": error.detail}
+            else:
+                rows[row_index] = {"index": row_index, "status_code": 200, "id": transaction_id}
+        await db.commit()
+        pending.clear()
+
+    async for row in _read_batch_rows(request):
+        index = len(rows)
+        try:
+            if isinstance(row, bytes):
+                tx = transaction_schema.TransactionCreate.model_validate_json(row)
+            else:
+                tx = transaction_schema.TransactionCreate.model_validate(row)
+        except ValidationError as e:
+            rows.append({"index": index, "status_code": 422, "detail": e.errors(include_url=False)[0]["msg"]})
+            continue
+        error = _validation_error(tx)
+        if error:
+            rows.append({"index": index, "status_code": 400, "detail": error})
+            continue
+        rows.append(None)
+        pending.append((index, tx.sender_id, tx.recv_id, tx.amount, models.TransactionType(tx.type.value)))
+        if len(pending) >= settings.BATCH_CHUNK_SIZE:
+            await post_pending()
+    if pending:
+        await post_pending()
 
-    if tx.sender_id:
-        sender = db.query(models.Account).filter(models.Account.id == tx.sender_id).first()
-        if not sender:
-            raise HTTPException(status_code=404, detail="Sender account not found")
-    if tx.recv_id:
-        receiver = db.query(models.Account).filter(models.Account.id == tx.recv_id).first()
-        if not receiver:
-            raise HTTPException(status_code=404, detail="Receiver account not found")
+    posted = sum(1 for row in rows if row["status_code"] == 200)
+    return {"posted": posted, "failed": len(rows) - posted, "results": rows}
 
-    transaction = models.Transaction(**tx.model_dump())
-    db.add(transaction)
-    db.commit()
-    db.refresh(transaction)
-    return transaction
+
+# Keyset-paged rather than one server-side cursor, so archived periods can be merged
+# in by id chunk by chunk and no read transaction spans the whole export.
+async def _stream_transactions(db: AsyncSession, query, after_id: int):
+    keys = list(query.selected_columns.keys())
+    try:
+        while rows := await db.run_sync(partitions.rows_after_id, query, after_id, settings.STREAM_CHUNK_SIZE):
+            yield fastjson.encode_ndjson(keys, rows)
+            after_id = rows[-1].id
+    finally:
+        await db.close()
 
 
 @router.get("/transactions", response_model=List[transaction_schema.Transaction])
-def list_transactions(
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_user)
+async def list_transactions(
+    limit: int = Query(100, ge=1, le=settings.PAGE_SIZE_MAX, description="Maximum number of transactions per page"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    output_format: str = Query("json", alias="format", pattern="^(json|ndjson)$", description="ndjson streams every transaction after the cursor"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: TokenData = Depends(get_current_user)
 ):
-    return db.query(models.Transaction).all()
+    try:
+        after_id = decode_cursor(after) if after else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    query = select(*fastjson.schema_columns(transaction_schema.Transaction, models.Transaction))
+    if output_format == "ndjson":
+        return StreamingResponse(_stream_transactions(db, query, after_id), media_type="application/x-ndjson")
+
+    rows = await db.run_sync(partitions.rows_after_id, query, after_id, limit)
+    headers = {"X-Next-Cursor": encode_cursor(rows[-1].id)} if len(rows) == limit else None
+    return fastjson.rows_response(query.selected_columns.keys(), rows, headers=headers)
 
 
 @router.post("/transactions/{transaction_id}/reverse", response_model=transaction_schema.ReversalResult)
-def reverse_transaction(
+async def reverse_transaction(
     transaction_id: int = Path(..., description="ID of the transaction to reverse"),
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_user)
 ):
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admins can reverse transactions")
 
-    original_tx = db.query(models.Transaction).filter(models.Transaction.id == transaction_id).first()
+    original_tx = await db.get(models.Transaction, transaction_id)
     if not original_tx:
+        archive = await db.run_sync(partitions.find_archived, transaction_id)
+        if archive is not None:
+            raise HTTPException(
+                status_code=409, detail=f"Transaction is archived in {archive.period} and can no longer be reversed"
+            )
         raise HTTPException(status_code=404, detail="Transaction not found")
 
     if original_tx.reversed:
         raise HTTPException(status_code=400, detail="Transaction is already reversed")
 
-    if original_tx.type == transaction_schema.TransactionType.reversal:
+    if original_tx.type == models.TransactionType.reversal:
         raise HTTPException(status_code=400, detail="Cannot reverse a reversal transaction")
 
-    original_tx.reversed = True
+    try:
+        reversal_tx = await db.run_sync(posting.reverse_transaction, original_tx)
+    except posting.PostingError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-    reversal_tx = models.Transaction(
-        sender_id=original_tx.recv_id,
-        recv_id=original_tx.sender_id,
-        amount=original_tx.amount,
-        type=transaction_schema.TransactionType.reversal
-    )
-
-    db.add(reversal_tx)
-    db.commit()
-    db.refresh(original_tx)
-    db.refresh(reversal_tx)
+    await db.commit()
+    await db.refresh(original_tx)
+    await db.refresh(reversal_tx)
 
     return {
         "original": original_tx,
@@ -94,37 +258,80 @@ def reverse_transaction(
     }
 
 
+@router.post("/transactions/reverse-batch", response_model=transaction_schema.ReverseBatchResult)
+async def reverse_transactions_batch(
+    selection: transaction_schema.ReverseBatchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: TokenData = Depends(get_current_user)
+):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Only admins can reverse transactions")
+
+    if selection.ids is not None:
+        criteria = [models.Transaction.id.in_(selection.ids)]
+    else:
+        # Archived rows are read-only, so a range reaching into an archived month is refused
+        # rather than reversing only its unarchived part.
+        archives = await db.run_sync(partitions.archived_periods, selection.start, selection.end)
+        if archives:
+            periods = ", ".join(archive.period for archive in archives)
+            raise HTTPException(
+                status_code=409, detail=f"Range overlaps archived periods {periods}; archived transactions cannot be reversed"
+            )
+        criteria = [models.Transaction.timestamp >= selection.start, models.Transaction.timestamp <= selection.end]
+        if selection.account_id is not None:
+            criteria.append(or_(
+                models.Transaction.sender_id == selection.account_id,
+                models.Transaction.recv_id == selection.account_id,
+            ))
+
+    outcomes = await db.run_sync(posting.reverse_batch, criteria, selection.ids)
+    await db.commit()
+
+    rows = []
+    for original_id, reversal_id, error in outcomes:
+        if error:
+            rows.append({"id": original_id, "status_code": error.status_code, "detail": error.detail})
+        else:
+            rows.append({"id": original_id, "status_code": 200, "reversal_id": reversal_id})
+    reversed_count = sum(1 for row in rows if row["status_code"] == 200)
+    return {"reversed": reversed_count, "failed": len(rows) - reversed_count, "results": rows}
+
+
 @router.get("/transactions/by-date", response_model=List[transaction_schema.Transaction])
-def filter_transactions_by_date(
+async def filter_transactions_by_date(
     start: datetime = Query(..., description="Start date (inclusive)"),
     end: datetime = Query(..., description="End date (inclusive)"),
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: TokenData = Depends(get_current_user)
 ):
-    query = db.query(models.Transaction).filter(
-        models.Transaction.timestamp >= start,
-        models.Transaction.timestamp <= end
-    )
-
+    criteria = []
     if current_user.role != "admin":
-        query = query.join(models.Account, models.Transaction.sender_id == models.Account.id)
+        criteria.append(models.Transaction.sender_id.is_not(None))
 
-    return query.all()
+    return await db.run_sync(partitions.transactions_between, start, end, *criteria)
 
 
 @router.get("/transactions/by-account/{account_id}", response_model=List[transaction_schema.Transaction])
-def filter_transactions_by_account(
+async def filter_transactions_by_account(
     account_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.Employee = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: TokenData = Depends(get_current_user)
 ):
-    account = db.query(models.Account).filter(models.Account.id == account_id).first()
-    if not account:
+    if not await db.scalar(select(models.Account.id).where(models.Account.id == account_id)):
         raise HTTPException(status_code=404, detail="Account not found")
 
-    transactions = db.query(models.Transaction).filter(
-        (models.Transaction.sender_id == account_id) |
-        (models.Transaction.recv_id == account_id)
-    ).all()
+    return await db.run_sync(
+        partitions.merge_with_archives, lambda source: account_transactions_query(source, account_id).all()
+    )
 
-    return transactions
+
+def account_transactions_query(db: Session, account_id: int):
+    # Two seeks on the (sender_id, timestamp) and (recv_id, timestamp) indexes
+    # instead of an OR that forces a full scan; self-transfers are kept once.
+    sent = db.query(models.Transaction).filter(models.Transaction.sender_id == account_id)
+    received = db.query(models.Transaction).filter(
+        models.Transaction.recv_id == account_id,
+        or_(models.Transaction.sender_id.is_(None), models.Transaction.sender_id != account_id)
+    )
+    return sent.union_all(received).order_by(models.Transaction.timestamp, models.Transaction.id)
@@ -8,6 +8,52 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 60))
+    JWT_KEY_ID: str = os.getenv("JWT_KEY_ID", "")
+    JWT_PRIVATE_KEY_FILE: str = os.getenv("JWT_PRIVATE_KEY_FILE", "")
+    JWT_PUBLIC_KEYS_DIR: str = os.getenv("JWT_PUBLIC_KEYS_DIR", "")
+    JWT_CACHE_MAX_SIZE: int = int(os.getenv("JWT_CACHE_MAX_SIZE", 10000))
+    BCRYPT_WORKERS: int = int(os.getenv("BCRYPT_WORKERS", 0))
+    BCRYPT_MAX_PENDING: int = int(os.getenv("BCRYPT_MAX_PENDING", 64))
+    AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", 60))
+    AUTH_CACHE_MAX_SIZE: int = int(os.getenv("AUTH_CACHE_MAX_SIZE", 10000))
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./bank.db")
+    READ_DATABASE_URL: str = os.getenv("READ_DATABASE_URL", "")
+    READ_AFTER_WRITE_SECONDS: float = float(os.getenv("READ_AFTER_WRITE_SECONDS", 5))
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", 30))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+    ADMISSION_MAX_IN_FLIGHT: int = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", DB_POOL_SIZE + DB_MAX_OVERFLOW))
+    ADMISSION_QUEUE_SIZE: int = int(os.getenv("ADMISSION_QUEUE_SIZE", 32))
+    ADMISSION_QUEUE_TIMEOUT_MS: int = int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", 200))
+    RATE_LIMIT_STORAGE_URL: str = os.getenv("RATE_LIMIT_STORAGE_URL", "")
+    RATE_LIMIT_MAX_KEYS: int = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+    RATE_LIMIT_ACCOUNTS: str = os.getenv("RATE_LIMIT_ACCOUNTS", "50/100")
+    RATE_LIMIT_EMPLOYEES: str = os.getenv("RATE_LIMIT_EMPLOYEES", "10/20")
+    RATE_LIMIT_EVENTS: str = os.getenv("RATE_LIMIT_EVENTS", "5/20")
+    RATE_LIMIT_TRANSACTIONS: str = os.getenv("RATE_LIMIT_TRANSACTIONS", "20/50")
+    PREFORK_WARMUP: bool = os.getenv("PREFORK_WARMUP", "true").lower() == "true"
+    THREADPOOL_SIZE: int = int(os.getenv("THREADPOOL_SIZE", 40))
+    ACCOUNT_CACHE_TTL_SECONDS: int = int(os.getenv("ACCOUNT_CACHE_TTL_SECONDS", 30))
+    ACCOUNT_CACHE_MAX_SIZE: int = int(os.getenv("ACCOUNT_CACHE_MAX_SIZE", 100000))
+    IDEMPOTENCY_KEY_TTL_HOURS: int = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", 24))
+    IDEMPOTENCY_CACHE_MAX_SIZE: int = int(os.getenv("IDEMPOTENCY_CACHE_MAX_SIZE", 10000))
+    ARCHIVE_DIR: str = os.getenv("ARCHIVE_DIR", "./archive")
+    ARCHIVE_AFTER_MONTHS: int = int(os.getenv("ARCHIVE_AFTER_MONTHS", 12))
+    PARTITION_MONTHS_AHEAD: int = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+    OUTBOX_POLL_INTERVAL_SECONDS: float = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", 0.5))
+    OUTBOX_MAX_WAIT_SECONDS: float = float(os.getenv("OUTBOX_MAX_WAIT_SECONDS", 30))
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_SLOW_MS: int = int(os.getenv("PROFILE_SLOW_MS", 500))
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "./profiles")
+    PAGE_SIZE_MAX: int = int(os.getenv("PAGE_SIZE_MAX", 1000))
+    STREAM_CHUNK_SIZE: int = int(os.getenv("STREAM_CHUNK_SIZE", 1000))
+    BATCH_CHUNK_SIZE: int = int(os.getenv("BATCH_CHUNK_SIZE", 1000))
 
 settings = Settings()
@@ -0,0 +1,190 @@
+import cProfile
+import functools
+import inspect
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+
+from app.core import metrics
+from app.core.config import settings
+
+ROW_BUCKETS = (1, 10, 100, 1000, 10000, 100000)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 25, 50, 100)
+
+request_duration = metrics.histogram(
+    "bankbase_request_duration_seconds", "Wall time spent handling a request", ("method", "route", "status")
+)
+request_db_duration = metrics.histogram(
+    "bankbase_request_db_seconds", "Time spent executing SQL statements per request", ("method", "route", "status")
+)
+request_statements = metrics.histogram(
+    "bankbase_request_sql_statements", "SQL statements executed per request", ("method", "route", "status"), STATEMENT_BUCKETS
+)
+request_rows = metrics.histogram(
+    "bankbase_request_rows", "Rows loaded or written per request", ("method", "route", "status"), ROW_BUCKETS
+)
+
+
+@dataclass
+class RequestStats:
+    statements: int = 0
+    db_seconds: float = 0.0
+    rows: int = 0
+    profiler: Optional[cProfile.Profile] = field(default=None, repr=False)
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("bankbase_request_stats", default=None)
+
+
+def current_stats() -> Optional[RequestStats]:
+    return _current.get()
+
+
+def record_rows(count: int):
+    stats = _current.get()
+    if stats is not None:
+        stats.rows += count
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("bankbase_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get("bankbase_query_start"):
+        return
+    stats.statements += 1
+    stats.db_seconds += time.perf_counter() - conn.info["bankbase_query_start"].pop()
+    if context is not None and (context.isinsert or context.isupdate or context.isdelete):
+        stats.rows += max(cursor.rowcount, 0)
+
+
+def _on_load(target, context):
+    record_rows(1)
+
+
+def install_sql_listeners():
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Mapper, "load", _on_load)
+
+
+def _dump_profile(profiler: cProfile.Profile, method: str, route: str, elapsed: float):
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    name = f"{int(time.time() * 1000)}-{method}{route.replace('/', '_')}-{int(elapsed * 1000)}ms.prof"
+    profiler.dump_stats(os.path.join(settings.PROFILE_DIR, name))
+
+
+# At most one sampled profile is live per process; requests arriving while it runs are
+# simply not sampled, so two profiles never compete for the same thread's hook.
+_profile_slot = threading.Lock()
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        if (
+            settings.PROFILE_SAMPLE_RATE
+            and random.random() < settings.PROFILE_SAMPLE_RATE
+            and _profile_slot.acquire(blocking=False)
+        ):
+            stats.profiler = cProfile.Profile()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched", str(status))
+            request_duration.observe(elapsed, *labels)
+            request_db_duration.observe(stats.db_seconds, *labels)
+            request_statements.observe(stats.statements, *labels)
+            request_rows.observe(stats.rows, *labels)
+            if stats.profiler is not None:
+                _profile_slot.release()
+                if elapsed * 1000 >= settings.PROFILE_SLOW_MS:
+                    _dump_profile(stats.profiler, *labels[:2], elapsed)
+
+
+# Drives a coroutine step by step with the profiler on only while the coroutine itself
+# runs; whatever the event loop does between its awaits stays out of the profile.
+class _ProfiledCoroutine:
+    def __init__(self, coro, profiler: cProfile.Profile):
+        self.coro = coro
+        self.profiler = profiler
+
+    def __await__(self):
+        step, value = self.coro.send, None
+        while True:
+            self.profiler.enable()
+            try:
+                awaited = step(value)
+            except StopIteration as done:
+                return done.value
+            finally:
+                self.profiler.disable()
+            try:
+                value, step = (yield awaited), self.coro.send
+            except GeneratorExit:
+                self.coro.close()
+                raise
+            except BaseException as e:
+                value, step = e, self.coro.throw
+
+
+# Sync endpoints run in a worker thread, so a sampled request's profiler has to be
+# switched on inside the endpoint call rather than in the middleware.
+def _profiled(endpoint):
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            stats = _current.get()
+            if stats is None or stats.profiler is None:
+                return await endpoint(*args, **kwargs)
+            return await _ProfiledCoroutine(endpoint(*args, **kwargs), stats.profiler)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            stats = _current.get()
+            if stats is None or stats.profiler is None:
+                return endpoint(*args, **kwargs)
+            stats.profiler.enable()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                stats.profiler.disable()
+    return wrapper
+
+
+class InstrumentedRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
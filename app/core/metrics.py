@@ -0,0 +1,69 @@
+import threading
+from bisect import bisect_left
+from typing import Callable, Sequence
+
+_gauges: list[tuple[str, str, Callable[[], float]]] = []
+_histograms: list["Histogram"] = []
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def gauge(name: str, help: str):
+    def register(fn: Callable[[], float]):
+        _gauges.append((name, help, fn))
+        return fn
+    return register
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+        for labels, counts, total, value_sum in sorted(snapshot):
+            label_text = ",".join(f'{name}="{value}"' for name, value in zip(self.labelnames, labels))
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {total}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {value_sum}")
+            lines.append(f"{self.name}_count{{{label_text}}} {total}")
+        return lines
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str], buckets: Sequence[float] = DURATION_BUCKETS) -> Histogram:
+    instrument = Histogram(name, help, labelnames, buckets)
+    _histograms.append(instrument)
+    return instrument
+
+
+def render() -> str:
+    lines = []
+    for name, help, fn in _gauges:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {fn()}")
+    for instrument in _histograms:
+        lines.extend(instrument.render())
+    return "\n".join(lines) + "\n"
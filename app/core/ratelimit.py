@@ -0,0 +1,275 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Optional
+
+from anyio import to_thread
+
+from app.core import metrics
+from app.core.config import settings
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+
+
+def parse_budget(spec: str) -> Optional[tuple[float, float]]:
+    # "<tokens per second>/<burst>"; an empty spec or a zero rate disables the budget.
+    rate, _, burst = spec.strip().partition("/")
+    if not rate or float(rate) <= 0:
+        return None
+    return float(rate), max(float(burst or rate), 1.0)
+
+
+budgets: dict[str, Optional[tuple[float, float]]] = {
+    "accounts": parse_budget(settings.RATE_LIMIT_ACCOUNTS),
+    "employees": parse_budget(settings.RATE_LIMIT_EMPLOYEES),
+    "events": parse_budget(settings.RATE_LIMIT_EVENTS),
+    "transactions": parse_budget(settings.RATE_LIMIT_TRANSACTIONS),
+}
+
+
+def _take(tokens: float, elapsed: float, rate: float, burst: float) -> tuple[float, float]:
+    tokens = min(burst, tokens + max(elapsed, 0.0) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class MemoryBuckets:
+    blocking = False
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens, retry_after = _take(tokens, now - updated, rate, burst)
+            self._buckets[key] = (tokens, now)
+            # The least recently used bucket is the one most likely to have refilled anyway.
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# Shared between the workers of one host through a WAL-mode SQLite file.
+class SQLiteBuckets:
+    blocking = True
+    PRUNE_EVERY = 1000
+    IDLE_SECONDS = 3600
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=settings.SQLITE_BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row or (burst, now)
+            tokens, retry_after = _take(tokens, now - updated, rate, burst)
+            conn.execute(
+                "INSERT INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            self._takes += 1
+            if self._takes % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM rate_buckets WHERE updated < ?", (now - self.IDLE_SECONDS,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+    def clear(self):
+        self._connection().execute("DELETE FROM rate_buckets")
+
+
+# Any server speaking the Redis protocol; the bucket update runs as one script on the
+# server's clock, so every worker on every host sees the same budget.
+_REDIS_TAKE = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(now - updated, 0) * rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(retry_after)
+"""
+
+
+class RedisBuckets:
+    blocking = True
+    PREFIX = "bankbase:ratelimit:"
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.1)
+        self._script = self.client.register_script(_REDIS_TAKE)
+
+    def take(self, key: str, rate: float, burst: float) -> float:
+        return float(self._script(keys=[self.PREFIX + key], args=[rate, burst]))
+
+    def clear(self):
+        keys = list(self.client.scan_iter(self.PREFIX + "*"))
+        if keys:
+            self.client.delete(*keys)
+
+
+def create_buckets(url: str):
+    if not url or url == "memory":
+        return MemoryBuckets(settings.RATE_LIMIT_MAX_KEYS)
+    if url.startswith("sqlite:///"):
+        return SQLiteBuckets(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBuckets(url)
+    raise ValueError(f"Unsupported RATE_LIMIT_STORAGE_URL: {url}")
+
+
+@lru_cache(maxsize=None)
+def buckets():
+    return create_buckets(settings.RATE_LIMIT_STORAGE_URL)
+
+
+_backend_errors = 0
+
+
+@metrics.gauge("bankbase_rate_limit_backend_errors", "Rate limit checks let through because the shared bucket store failed")
+def backend_errors() -> int:
+    return _backend_errors
+
+
+async def acquire(scope: str, employee_id: int):
+    global _backend_errors
+    budget = budgets.get(scope)
+    if budget is None:
+        return
+    store = buckets()
+    key = f"{scope}:{employee_id}"
+    if not store.blocking:
+        retry_after = store.take(key, *budget)
+    else:
+        # An unreachable shared store fails open rather than taking the API down with it.
+        try:
+            retry_after = await to_thread.run_sync(store.take, key, *budget)
+        except Exception:
+            _backend_errors += 1
+            return
+    if retry_after > 0:
+        raise RateLimited(retry_after)
+
+
+# Admission control: a process-wide cap on requests in flight, sized by default to the
+# database pool so excess load is shed with a 503 instead of queueing on pool checkout.
+# A short, bounded wait for a free slot absorbs bursts. Only touched from the event loop.
+# The event feeds are exempt: a long poll or an SSE stream spends its time sleeping
+# between polls, and holding a slot for it would starve the requests that do work.
+
+EXEMPT_PATHS = {"/", "/metrics", "/events", "/events/stream"}
+
+_in_flight = 0
+_waiters: deque = deque()
+
+
+@metrics.gauge("bankbase_requests_in_flight", "Requests admitted and not yet finished")
+def requests_in_flight() -> int:
+    return _in_flight
+
+
+async def _admit() -> bool:
+    global _in_flight
+    if _in_flight < settings.ADMISSION_MAX_IN_FLIGHT and not _waiters:
+        _in_flight += 1
+        return True
+    if len(_waiters) >= settings.ADMISSION_QUEUE_SIZE:
+        return False
+
+    # A released slot is handed straight to the oldest waiter, so _in_flight is unchanged.
+    waiter = asyncio.get_running_loop().create_future()
+    _waiters.append(waiter)
+    try:
+        await asyncio.wait_for(waiter, settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000)
+        return True
+    except asyncio.TimeoutError:
+        return False
+    except asyncio.CancelledError:
+        if waiter.done() and not waiter.cancelled():
+            _release()
+        raise
+    finally:
+        if waiter in _waiters:
+            _waiters.remove(waiter)
+
+
+def _release():
+    global _in_flight
+    while _waiters:
+        waiter = _waiters.popleft()
+        if not waiter.done():
+            waiter.set_result(None)
+            return
+    _in_flight -= 1
+
+
+class AdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS or settings.ADMISSION_MAX_IN_FLIGHT <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        if not await _admit():
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [(b"content-type", b"application/json"), (b"retry-after", b"1")],
+            })
+            await send({"type": "http.response.body", "body": b'{"detail":"Server is busy, please retry"}'})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _release()
@@ -1,21 +1,77 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, UTC
+from functools import lru_cache
 from typing import Optional
-from jose import jwt
-from passlib.context import CryptContext
 
+from app.core import metrics, tokens
+from app.core.tokens import InvalidToken
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+class HashingOverloaded(Exception):
+    pass
+
+# passlib's bcrypt backend is imported on first use, not with the app.
+@lru_cache(maxsize=None)
+def password_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_hashing_pool: Optional[ProcessPoolExecutor] = None
+_hashing_in_flight = 0
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_context().hash(password)
+
+def _get_hashing_pool() -> ProcessPoolExecutor:
+    global _hashing_pool
+    if _hashing_pool is None:
+        _hashing_pool = ProcessPoolExecutor(max_workers=settings.BCRYPT_WORKERS or os.cpu_count())
+    return _hashing_pool
+
+async def _run_hashing(fn, *args):
+    # Only touched from the event loop thread, so the counter needs no lock.
+    global _hashing_in_flight
+    if _hashing_in_flight >= settings.BCRYPT_MAX_PENDING:
+        raise HashingOverloaded()
+    _hashing_in_flight += 1
+    try:
+        return await asyncio.wrap_future(_get_hashing_pool().submit(fn, *args))
+    finally:
+        _hashing_in_flight -= 1
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_hashing(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hashing(get_password_hash, password)
+
+@metrics.gauge("bankbase_bcrypt_queue_depth", "Password hashing jobs submitted to the bcrypt pool and not yet finished")
+def hashing_queue_depth() -> int:
+    return _hashing_in_flight
+
+def shutdown_hashing_pool():
+    global _hashing_pool
+    if _hashing_pool is not None:
+        _hashing_pool.shutdown(cancel_futures=True)
+        _hashing_pool = None
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(UTC) + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    to_encode.update({"exp": int(expire.timestamp())})
+    return tokens.encode(to_encode)
+
+def decode_access_token(token: str) -> dict:
+    return tokens.decode(token)
+
+# Loads the lazily imported crypto stacks and key material up front; used by the pre-fork
+# server hook so forked workers share them copy-on-write instead of loading them per worker.
+def warm_up():
+    tokens.signing_key()
+    password_context().handler().get_backend()
@@ -0,0 +1,187 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Optional
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class InvalidToken(Exception):
+    pass
+
+
+HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+KID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+# token -> verified claims, kept until the token's own exp
+verified_tokens = TTLCache(settings.JWT_CACHE_MAX_SIZE, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+# Key objects are built once and reused; signing and verifying only feed them bytes.
+
+class HMACKey:
+    def __init__(self, secret: bytes, algorithm: str):
+        self._mac = hmac.new(secret, digestmod=HMAC_DIGESTS[algorithm])
+
+    def sign(self, message: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(message)
+        return mac.digest()
+
+    def verify(self, message: bytes, signature: bytes) -> bool:
+        return hmac.compare_digest(self.sign(message), signature)
+
+
+# RS*/ES* go through python-jose's key backends, which are imported only when configured.
+class JoseKey:
+    def __init__(self, pem: bytes, algorithm: str):
+        from jose import jwk
+
+        self._key = jwk.construct(pem.decode(), algorithm)
+
+    def sign(self, message: bytes) -> bytes:
+        return self._key.sign(message)
+
+    def verify(self, message: bytes, signature: bytes) -> bool:
+        return self._key.verify(message, signature)
+
+
+# python-jose has no EdDSA support, so Ed25519 needs the optional cryptography package.
+class Ed25519Key:
+    def __init__(self, pem: bytes):
+        from cryptography.hazmat.primitives import serialization
+
+        if b"PRIVATE KEY" in pem:
+            self._private = serialization.load_pem_private_key(pem, password=None)
+            self._public = self._private.public_key()
+        else:
+            self._private = None
+            self._public = serialization.load_pem_public_key(pem)
+
+    def sign(self, message: bytes) -> bytes:
+        if self._private is None:
+            raise ValueError("EdDSA signing needs a private key")
+        return self._private.sign(message)
+
+    def verify(self, message: bytes, signature: bytes) -> bool:
+        from cryptography.exceptions import InvalidSignature
+
+        try:
+            self._public.verify(signature, message)
+        except InvalidSignature:
+            return False
+        return True
+
+
+def load_key(material: bytes, algorithm: str):
+    if algorithm in HMAC_DIGESTS:
+        return HMACKey(material, algorithm)
+    if algorithm == "EdDSA":
+        return Ed25519Key(material)
+    return JoseKey(material, algorithm)
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=None)
+def signing_key():
+    if settings.ALGORITHM in HMAC_DIGESTS:
+        return load_key(settings.SECRET_KEY.encode(), settings.ALGORITHM)
+    if not settings.JWT_PRIVATE_KEY_FILE:
+        raise RuntimeError(f"{settings.ALGORITHM} tokens need JWT_PRIVATE_KEY_FILE")
+    return load_key(_read(settings.JWT_PRIVATE_KEY_FILE), settings.ALGORITHM)
+
+
+# Rotation: tokens name their key in the `kid` header. Public keys live in
+# JWT_PUBLIC_KEYS_DIR as <kid>.pem and are loaded on first sight, so a new key can be
+# published before it starts signing and an old one stays valid until its file is removed.
+_verifiers: dict[str, object] = {}
+_verifiers_lock = threading.Lock()
+
+
+def verifier(kid: Optional[str]):
+    if settings.ALGORITHM in HMAC_DIGESTS:
+        return signing_key()
+    if kid is None and not settings.JWT_KEY_ID and settings.JWT_PRIVATE_KEY_FILE:
+        return signing_key()
+    if not isinstance(kid, str) or not KID_PATTERN.match(kid):
+        return None
+    with _verifiers_lock:
+        key = _verifiers.get(kid)
+        if key is None:
+            path = os.path.join(settings.JWT_PUBLIC_KEYS_DIR, f"{kid}.pem") if settings.JWT_PUBLIC_KEYS_DIR else ""
+            if path and os.path.exists(path):
+                key = load_key(_read(path), settings.ALGORITHM)
+            elif kid == settings.JWT_KEY_ID and settings.JWT_PRIVATE_KEY_FILE:
+                key = signing_key()
+            else:
+                return None
+            _verifiers[kid] = key
+        return key
+
+
+def reload_keys():
+    signing_key.cache_clear()
+    with _verifiers_lock:
+        _verifiers.clear()
+    verified_tokens.clear()
+
+
+def encode(claims: dict) -> str:
+    header = {"alg": settings.ALGORITHM, "typ": "JWT"}
+    if settings.JWT_KEY_ID:
+        header["kid"] = settings.JWT_KEY_ID
+    signing_input = (
+        _b64encode(json.dumps(header, separators=(",", ":")).encode())
+        + b"."
+        + _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    )
+    return (signing_input + b"." + _b64encode(signing_key().sign(signing_input))).decode()
+
+
+def decode(token: str) -> dict:
+    claims = verified_tokens.get(token)
+    if claims is not None:
+        return claims
+
+    try:
+        header_segment, claims_segment, signature_segment = token.split(".")
+        header = json.loads(_b64decode(header_segment))
+        signature = _b64decode(signature_segment)
+    except ValueError as e:
+        raise InvalidToken() from e
+    if not isinstance(header, dict) or header.get("alg") != settings.ALGORITHM:
+        raise InvalidToken()
+    key = verifier(header.get("kid"))
+    if key is None or not key.verify(f"{header_segment}.{claims_segment}".encode(), signature):
+        raise InvalidToken()
+
+    try:
+        claims = json.loads(_b64decode(claims_segment))
+    except ValueError as e:
+        raise InvalidToken() from e
+    if not isinstance(claims, dict) or not isinstance(claims.get("exp"), (int, float)):
+        raise InvalidToken()
+    expires_in = claims["exp"] - time.time()
+    if expires_in <= 0:
+        raise InvalidToken()
+    verified_tokens.set(token, claims, ttl=expires_in)
+    return claims
@@ -0,0 +1,43 @@
+from dataclasses import dataclass
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db import models
+
+
+@dataclass(frozen=True)
+class AccountState:
+    is_active: bool
+    version: int
+
+
+# account_id -> AccountState. The posting UPDATE re-checks is_active and version, so a
+# stale entry can only cost a retry or, for TTL seconds, an extra "inactive" rejection.
+account_states = TTLCache(settings.ACCOUNT_CACHE_MAX_SIZE, settings.ACCOUNT_CACHE_TTL_SECONDS)
+
+
+def cached(account_id: int) -> Optional[AccountState]:
+    return account_states.get(account_id)
+
+
+def remember(account_id: int, is_active: bool, version: int) -> AccountState:
+    state = AccountState(is_active, version)
+    account_states.set(account_id, state)
+    return state
+
+
+def load(db: Session, account_id: int) -> Optional[AccountState]:
+    row = db.execute(
+        select(models.Account.is_active, models.Account.version).where(models.Account.id == account_id)
+    ).first()
+    if row is None:
+        account_states.pop(account_id)
+        return None
+    return remember(account_id, row.is_active, row.version)
+
+
+def invalidate(account_id: int):
+    account_states.pop(account_id)
@@ -1,17 +1,102 @@
-from sqlalchemy import create_engine
+import time
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import Session
 from app.core.config import settings
 
 DATABASE_URL = settings.DATABASE_URL
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver:
+        parsed = parsed.set(drivername=driver)
+    return parsed.render_as_string(hide_password=False)
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def _engine_options(url: str, options: dict) -> dict:
+    parsed = make_url(url)
+    if _is_sqlite(url):
+        options.setdefault("connect_args", {"check_same_thread": False})
+        if parsed.database in (None, "", ":memory:"):
+            return options
+    if "poolclass" not in options:
+        options.setdefault("pool_size", settings.DB_POOL_SIZE)
+        options.setdefault("max_overflow", settings.DB_MAX_OVERFLOW)
+        options.setdefault("pool_timeout", settings.DB_POOL_TIMEOUT)
+    options.setdefault("pool_recycle", settings.DB_POOL_RECYCLE)
+    options.setdefault("pool_pre_ping", settings.DB_POOL_PRE_PING)
+    return options
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+def create_db_engine(url: str, **options) -> Engine:
+    db_engine = create_engine(url, **_engine_options(url, options))
+    if _is_sqlite(url):
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+def create_async_db_engine(url: str, **options) -> AsyncEngine:
+    url = async_database_url(url)
+    db_engine = create_async_engine(url, **_engine_options(url, options))
+    if _is_sqlite(url):
+        event.listen(db_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+engine = create_db_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine(DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async_read_engine = create_async_db_engine(settings.READ_DATABASE_URL) if settings.READ_DATABASE_URL else async_engine
+AsyncReadSessionLocal = async_sessionmaker(
+    async_read_engine, autoflush=False, expire_on_commit=False, info={"replica": True}
+)
+
+def has_replica() -> bool:
+    return async_read_engine is not async_engine
+
+# Read-your-writes: primary commits made while handling a request are collected here,
+# and auth.ReadAfterWriteMiddleware hands the last one back to the client. The client
+# carries it on later requests, so every worker on every host can honour it.
+request_commits: ContextVar[Optional[list[float]]] = ContextVar("bankbase_request_commits", default=None)
+
+# AsyncSession commits through its sync Session, so this covers both kinds.
+@event.listens_for(Session, "after_commit")
+def _remember_commit(session: Session):
+    commits = request_commits.get()
+    if commits is not None and not session.info.get("replica"):
+        commits.append(time.time())
+
+def read_session(last_write: Optional[float] = None) -> AsyncSession:
+    age = time.time() - last_write if last_write is not None else None
+    if not has_replica() or (age is not None and 0 <= age < settings.READ_AFTER_WRITE_SECONDS):
+        return AsyncSessionLocal()
+    return AsyncReadSessionLocal()
+
 def get_db():
     db: Session = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,117 @@
+import asyncio
+import hashlib
+import json
+import sys
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, UTC
+from typing import Any, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.db import models
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status_code: int
+    body: Any
+
+
+# (employee_id, key) -> StoredResponse; the table stays the source of truth.
+response_cache = TTLCache(settings.IDEMPOTENCY_CACHE_MAX_SIZE, settings.IDEMPOTENCY_KEY_TTL_HOURS * 3600)
+
+# Only touched from the event loop, so the table itself needs no lock.
+_locks: dict[tuple[int, str], list] = {}
+
+
+def fingerprint(payload: bytes) -> str:
+    return hashlib.sha256(payload).hexdigest()
+
+
+# Serializes requests sharing a key inside this process, so a retry that arrives while
+# the first attempt is still posting waits for its result instead of posting again.
+@asynccontextmanager
+async def key_lock(employee_id: int, key: str):
+    scope = (employee_id, key)
+    entry = _locks.setdefault(scope, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            del _locks[scope]
+
+
+def _cutoff() -> datetime:
+    return datetime.now(UTC) - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+
+
+def lookup(db: Session, employee_id: int, key: str) -> Optional[StoredResponse]:
+    stored = response_cache.get((employee_id, key))
+    if stored is not None:
+        return stored
+
+    row = db.execute(
+        select(models.IdempotencyKey.fingerprint, models.IdempotencyKey.status_code, models.IdempotencyKey.response)
+        .where(
+            models.IdempotencyKey.employee_id == employee_id,
+            models.IdempotencyKey.key == key,
+            models.IdempotencyKey.created_on >= _cutoff(),
+        )
+    ).first()
+    if row is None:
+        return None
+    stored = StoredResponse(row.fingerprint, row.status_code, json.loads(row.response))
+    response_cache.set((employee_id, key), stored)
+    return stored
+
+
+# Adds the key row to the caller's transaction, so it commits or rolls back together
+# with the posting it describes. Expired rows for the same key are cleared first.
+def store(db: Session, employee_id: int, key: str, stored: StoredResponse):
+    db.execute(delete(models.IdempotencyKey).where(
+        models.IdempotencyKey.employee_id == employee_id,
+        models.IdempotencyKey.key == key,
+        models.IdempotencyKey.created_on < _cutoff(),
+    ))
+    db.add(models.IdempotencyKey(
+        employee_id=employee_id,
+        key=key,
+        fingerprint=stored.fingerprint,
+        status_code=stored.status_code,
+        response=json.dumps(stored.body),
+    ))
+
+
+def remember(employee_id: int, key: str, stored: StoredResponse):
+    response_cache.set((employee_id, key), stored)
+
+
+# store() only clears expired rows for the key it writes, so the rest are purged by a
+# periodic `python -m app.db.idempotency purge`.
+def purge_expired(db: Session) -> int:
+    result = db.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.created_on < _cutoff()))
+    return result.rowcount
+
+
+def main(argv: list[str]) -> int:
+    from app.db.database import SessionLocal
+
+    if argv != ["purge"]:
+        print("usage: python -m app.db.idempotency purge")
+        return 2
+    with SessionLocal() as db:
+        purged = purge_expired(db)
+        db.commit()
+    print(f"{purged} expired idempotency keys purged")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
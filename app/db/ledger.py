@@ -0,0 +1,201 @@
+import sys
+from sqlalchemy import (
+    BigInteger, Column, DateTime, MetaData, Table, bindparam, case, delete, func, literal, select, true, union_all,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db import models, partitions
+from app.db.types import Money
+
+summary_table = models.AccountLedgerSummary.__table__
+
+# Per-account totals of the archived periods, staged next to the hot table for the
+# duration of a rebuild so the recomputation stays one set-based statement.
+archived_totals = Table(
+    "ledger_archived_totals", MetaData(),
+    Column("account_id", BigInteger), Column("amount_in", Money), Column("amount_out", Money),
+    Column("n_in", BigInteger), Column("n_out", BigInteger), Column("timestamp", DateTime),
+    prefixes=["TEMPORARY"],
+)
+
+
+def _insert(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(summary_table)
+    return sqlite.insert(summary_table)
+
+
+# Folds postings (sender_id, recv_id, amount, timestamp) into the per-account
+# summary. Must run after the balances were moved, inside the same transaction.
+def record_postings(db: Session, postings: list[tuple]):
+    changes = {}
+    for sender_id, recv_id, amount, timestamp in postings:
+        for account_id, direction in ((recv_id, "in"), (sender_id, "out")):
+            if account_id is None:
+                continue
+            change = changes.setdefault(account_id, {
+                "account_id": account_id, "total_in": 0, "total_out": 0,
+                "count_in": 0, "count_out": 0, "last_activity": timestamp,
+            })
+            change[f"total_{direction}"] += amount
+            change[f"count_{direction}"] += 1
+            change["last_activity"] = max(change["last_activity"], timestamp)
+    if not changes:
+        return
+
+    current_balance = (
+        select(models.Account.balance)
+        .where(models.Account.id == bindparam("account_id"))
+        .scalar_subquery()
+    )
+    stmt = _insert(db).values({
+        "account_id": bindparam("account_id"),
+        "opening_balance": current_balance - bindparam("total_in") + bindparam("total_out"),
+        "total_in": bindparam("total_in"),
+        "total_out": bindparam("total_out"),
+        "count_in": bindparam("count_in"),
+        "count_out": bindparam("count_out"),
+        "last_activity": bindparam("last_activity"),
+    })
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[summary_table.c.account_id],
+        set_={
+            "total_in": summary_table.c.total_in + stmt.excluded.total_in,
+            "total_out": summary_table.c.total_out + stmt.excluded.total_out,
+            "count_in": summary_table.c.count_in + stmt.excluded.count_in,
+            "count_out": summary_table.c.count_out + stmt.excluded.count_out,
+            "last_activity": case(
+                (stmt.excluded.last_activity > summary_table.c.last_activity, stmt.excluded.last_activity),
+                else_=func.coalesce(summary_table.c.last_activity, stmt.excluded.last_activity),
+            ),
+        },
+    )
+    db.execute(stmt, [changes[account_id] for account_id in sorted(changes)])
+
+
+def _totals(*extra):
+    tx = models.Transaction.__table__
+    flows = union_all(
+        select(
+            tx.c.recv_id.label("account_id"), tx.c.amount.label("amount_in"),
+            literal(0, Money).label("amount_out"), literal(1).label("n_in"), literal(0).label("n_out"),
+            tx.c.timestamp,
+        ).where(tx.c.recv_id.is_not(None)),
+        select(
+            tx.c.sender_id, literal(0, Money), tx.c.amount, literal(0), literal(1), tx.c.timestamp,
+        ).where(tx.c.sender_id.is_not(None)),
+        *extra,
+    ).subquery()
+    return (
+        select(
+            flows.c.account_id,
+            func.sum(flows.c.amount_in).label("total_in"),
+            func.sum(flows.c.amount_out).label("total_out"),
+            func.sum(flows.c.n_in).label("count_in"),
+            func.sum(flows.c.n_out).label("count_out"),
+            func.max(flows.c.timestamp).label("last_activity"),
+        )
+        .group_by(flows.c.account_id)
+    )
+
+
+# Totals over the hot table plus every archived period. Each archive is aggregated in
+# its own file and the pre-summed rows join the hot flows before grouping.
+def _recomputed_totals(db: Session):
+    archives = partitions.archived_periods(db)
+    if not archives:
+        return _totals().subquery()
+
+    conn = db.connection()
+    archived_totals.drop(conn, checkfirst=True)
+    archived_totals.create(conn)
+    for archive in archives:
+        rows = partitions.query_archive(archive, lambda archive_db: archive_db.execute(_totals()).all())
+        if rows:
+            conn.execute(archived_totals.insert(), [
+                {"account_id": row.account_id, "amount_in": row.total_in, "amount_out": row.total_out,
+                 "n_in": row.count_in, "n_out": row.count_out, "timestamp": row.last_activity}
+                for row in rows
+            ])
+    return _totals(select(archived_totals)).subquery()
+
+
+# Recomputes every summary from transactions, archived periods included, in one
+# set-based pass and returns the accounts whose stored summary or balance did not agree.
+def rebuild(db: Session) -> list[dict]:
+    accounts = models.Account.__table__
+    totals = _recomputed_totals(db)
+    total_in = func.coalesce(totals.c.total_in, 0)
+    total_out = func.coalesce(totals.c.total_out, 0)
+
+    problems = []
+    rows = db.execute(
+        select(
+            accounts.c.id, accounts.c.balance, total_in.label("total_in"), total_out.label("total_out"),
+            func.coalesce(totals.c.count_in, 0).label("count_in"),
+            func.coalesce(totals.c.count_out, 0).label("count_out"),
+            summary_table.c.opening_balance, summary_table.c.total_in.label("stored_in"),
+            summary_table.c.total_out.label("stored_out"), summary_table.c.count_in.label("stored_count_in"),
+            summary_table.c.count_out.label("stored_count_out"),
+        )
+        .outerjoin(totals, totals.c.account_id == accounts.c.id)
+        .outerjoin(summary_table, summary_table.c.account_id == accounts.c.id)
+    )
+    for row in rows:
+        if row.opening_balance is None:
+            continue
+        if (
+            row.stored_in != row.total_in
+            or row.stored_out != row.total_out
+            or row.stored_count_in != row.count_in
+            or row.stored_count_out != row.count_out
+        ):
+            problems.append({
+                "account_id": row.id, "issue": "summary_drift",
+                "expected": row.total_in - row.total_out, "actual": row.stored_in - row.stored_out,
+            })
+        expected_balance = row.opening_balance + row.total_in - row.total_out
+        if expected_balance != row.balance:
+            problems.append({
+                "account_id": row.id, "issue": "balance_mismatch",
+                "expected": expected_balance, "actual": row.balance,
+            })
+
+    columns = ["account_id", "opening_balance", "total_in", "total_out", "count_in", "count_out", "last_activity"]
+    source = (
+        select(
+            accounts.c.id, accounts.c.balance - total_in + total_out, total_in, total_out,
+            func.coalesce(totals.c.count_in, 0), func.coalesce(totals.c.count_out, 0), totals.c.last_activity,
+        )
+        .outerjoin(totals, totals.c.account_id == accounts.c.id)
+        .where(true())
+    )
+    stmt = _insert(db).from_select(columns, source)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[summary_table.c.account_id],
+        set_={column: stmt.excluded[column] for column in columns[2:]},
+    )
+    db.execute(stmt)
+    db.execute(delete(summary_table).where(summary_table.c.account_id.not_in(select(accounts.c.id))))
+    archived_totals.drop(db.connection(), checkfirst=True)
+    return problems
+
+
+def main(argv: list[str]) -> int:
+    from app.db.database import SessionLocal
+
+    if argv != ["rebuild"]:
+        print("usage: python -m app.db.ledger rebuild")
+        return 2
+    with SessionLocal() as db:
+        problems = rebuild(db)
+        db.commit()
+    for problem in problems:
+        print(f"account {problem['account_id']}: {problem['issue']} expected={problem['expected']} actual={problem['actual']}")
+    print(f"Ledger summaries rebuilt, {len(problems)} discrepancies")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,140 @@
+from datetime import datetime, UTC
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.db import ledger, models, partitions
+from app.db.database import engine
+
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("applied_on", DateTime, nullable=False),
+)
+
+
+def _create_indexes(conn: Connection, table, names):
+    for index in table.indexes:
+        if index.name in names:
+            index.create(conn, checkfirst=True)
+
+
+def add_transaction_indexes(conn: Connection):
+    _create_indexes(conn, models.Transaction.__table__, {
+        "ix_transactions_sender_id_timestamp",
+        "ix_transactions_recv_id_timestamp",
+        "ix_transactions_timestamp",
+    })
+
+
+def add_account_ledger_summary(conn: Connection):
+    models.AccountLedgerSummary.__table__.create(conn, checkfirst=True)
+    with Session(bind=conn) as db:
+        ledger.rebuild(db)
+
+
+MONEY_COLUMNS = {
+    "accounts": ("balance",),
+    "transactions": ("amount",),
+}
+
+
+def convert_money_to_minor_units(conn: Connection):
+    postgres = conn.dialect.name == "postgresql"
+    for table, columns in MONEY_COLUMNS.items():
+        for column in columns:
+            if postgres:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BIGINT USING ROUND({column} * 100)::BIGINT"
+                )
+            else:
+                # SQLite cannot change a column type in place; the REAL column keeps
+                # exact integral cents, which is all the Money type relies on.
+                conn.exec_driver_sql(f"UPDATE {table} SET {column} = CAST(ROUND({column} * 100) AS INTEGER)")
+
+    summary = models.AccountLedgerSummary.__table__
+    if postgres:
+        for column in ("opening_balance", "total_in", "total_out"):
+            conn.exec_driver_sql(
+                f"ALTER TABLE {summary.name} ALTER COLUMN {column} TYPE BIGINT USING ROUND({column})::BIGINT"
+            )
+    # Summaries are re-baselined from the converted data rather than scaled.
+    conn.execute(summary.delete())
+    with Session(bind=conn) as db:
+        ledger.rebuild(db)
+
+
+def add_idempotency_keys(conn: Connection):
+    models.IdempotencyKey.__table__.create(conn, checkfirst=True)
+
+
+def partition_transactions(conn: Connection):
+    models.TransactionArchive.__table__.create(conn, checkfirst=True)
+    partitions.partition_transactions(conn)
+
+
+def add_account_version(conn: Connection):
+    if "version" in {column["name"] for column in inspect(conn).get_columns("accounts")}:
+        return
+    conn.exec_driver_sql("ALTER TABLE accounts ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+def add_listing_indexes(conn: Connection):
+    _create_indexes(conn, models.Account.__table__, {
+        "ix_accounts_is_active_balance", "ix_accounts_balance", "ix_accounts_created_on",
+    })
+    _create_indexes(conn, models.Employee.__table__, {
+        "ix_employees_role_joined_on", "ix_employees_joined_on", "ix_employees_name",
+    })
+
+
+def add_outbox_events(conn: Connection):
+    models.OutboxEvent.__table__.create(conn, checkfirst=True)
+
+
+def add_account_daily_balances(conn: Connection):
+    models.AccountDailyBalance.__table__.create(conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    (1, "add_transaction_indexes", add_transaction_indexes),
+    (2, "add_account_ledger_summary", add_account_ledger_summary),
+    (3, "convert_money_to_minor_units", convert_money_to_minor_units),
+    (4, "add_idempotency_keys", add_idempotency_keys),
+    (5, "partition_transactions", partition_transactions),
+    (6, "add_account_version", add_account_version),
+    (7, "add_listing_indexes", add_listing_indexes),
+    (8, "add_outbox_events", add_outbox_events),
+    (9, "add_account_daily_balances", add_account_daily_balances),
+]
+
+
+def upgrade(bind: Engine = engine) -> list[str]:
+    applied_now = []
+    with bind.begin() as conn:
+        fresh = "accounts" not in inspect(conn).get_table_names()
+        schema_migrations.create(conn, checkfirst=True)
+        applied = set(conn.scalars(select(schema_migrations.c.version)))
+        if fresh:
+            models.Base.metadata.create_all(conn)
+            partitions.partition_transactions(conn)
+
+        for version, name, step in MIGRATIONS:
+            if version in applied:
+                continue
+            if not fresh:
+                step(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version, name=name, applied_on=datetime.now(UTC)
+            ))
+            applied_now.append(name)
+    return applied_now
+
+
+if __name__ == "__main__":
+    applied = upgrade()
+    print("\n".join(applied) if applied else "Database is up to date")
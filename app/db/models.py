@@ -1,15 +1,23 @@
 import enum
-from datetime import datetime, UTC
-from sqlalchemy import ForeignKey
+from datetime import date, datetime, UTC
+from decimal import Decimal
+from sqlalchemy import JSON, ForeignKey, Index, Text, UniqueConstraint
 from sqlalchemy import Enum as SqlEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship, DeclarativeBase
 
+from app.db.types import Money
+
 class Base(DeclarativeBase):
     pass
 
 
 class Employee(Base):
     __tablename__ = "employees"
+    __table_args__ = (
+        Index("ix_employees_role_joined_on", "role", "joined_on"),
+        Index("ix_employees_joined_on", "joined_on"),
+        Index("ix_employees_name", "name"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     name: Mapped[str] = mapped_column(nullable=False)
@@ -17,20 +25,28 @@ class Employee(Base):
     phone: Mapped[str] = mapped_column(nullable=True)
     password_hash: Mapped[str] = mapped_column(nullable=False)
     role: Mapped[str] = mapped_column(nullable=False)
-    joined_on: Mapped[datetime] = mapped_column(default=datetime.now(UTC))
+    joined_on: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
 
 
 class Account(Base):
     __tablename__ = "accounts"
+    __table_args__ = (
+        Index("ix_accounts_is_active_balance", "is_active", "balance"),
+        Index("ix_accounts_balance", "balance"),
+        Index("ix_accounts_created_on", "created_on"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     PID: Mapped[str] = mapped_column(unique=True, nullable=False)
     name: Mapped[str] = mapped_column(nullable=False)
     email: Mapped[str] = mapped_column(unique=True, nullable=False)
     phone: Mapped[str] = mapped_column(nullable=True)
-    balance: Mapped[float] = mapped_column(default=0.0)
-    created_on: Mapped[datetime] = mapped_column(default=datetime.now(UTC))
+    balance: Mapped[Decimal] = mapped_column(Money, default=Decimal("0"))
+    created_on: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
     is_active: Mapped[bool] = mapped_column(default=True)
+    version: Mapped[int] = mapped_column(default=1, server_default="1", nullable=False)
+
+    __mapper_args__ = {"version_id_col": version}
 
     sent_transactions: Mapped[list["Transaction"]] = relationship(
         "Transaction", foreign_keys="[Transaction.sender_id]",
@@ -42,6 +58,14 @@ class Account(Base):
         back_populates="receiver", cascade="all, delete"
     )
 
+    ledger_summary: Mapped["AccountLedgerSummary | None"] = relationship(
+        "AccountLedgerSummary", cascade="all, delete-orphan"
+    )
+
+    daily_balances: Mapped[list["AccountDailyBalance"]] = relationship(
+        "AccountDailyBalance", cascade="all, delete-orphan"
+    )
+
 
 class TransactionType(enum.Enum):
     deposit = "deposit"
@@ -51,14 +75,86 @@ class TransactionType(enum.Enum):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_sender_id_timestamp", "sender_id", "timestamp"),
+        Index("ix_transactions_recv_id_timestamp", "recv_id", "timestamp"),
+        Index("ix_transactions_timestamp", "timestamp"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     sender_id: Mapped[int | None] = mapped_column(ForeignKey("accounts.id"), nullable=True)
     recv_id: Mapped[int | None] = mapped_column(ForeignKey("accounts.id"), nullable=True)
-    amount: Mapped[float] = mapped_column(nullable=False)
-    timestamp: Mapped[datetime] = mapped_column(default=datetime.now(UTC))
+    amount: Mapped[Decimal] = mapped_column(Money, nullable=False)
+    timestamp: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
     reversed: Mapped[bool] = mapped_column(default=False)
     type: Mapped[TransactionType] = mapped_column(SqlEnum(TransactionType), default=TransactionType.transfer, nullable=False)
 
     sender: Mapped["Account"] = relationship("Account", foreign_keys=[sender_id], back_populates="sent_transactions")
-    receiver: Mapped["Account"] = relationship("Account", foreign_keys=[recv_id], back_populates="received_transactions")
\ No newline at end of file
+    receiver: Mapped["Account"] = relationship("Account", foreign_keys=[recv_id], back_populates="received_transactions")
+
+
+class AccountLedgerSummary(Base):
+    __tablename__ = "account_ledger_summary"
+
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), primary_key=True)
+    opening_balance: Mapped[Decimal] = mapped_column(Money, default=Decimal("0"))
+    total_in: Mapped[Decimal] = mapped_column(Money, default=Decimal("0"))
+    total_out: Mapped[Decimal] = mapped_column(Money, default=Decimal("0"))
+    count_in: Mapped[int] = mapped_column(default=0)
+    count_out: Mapped[int] = mapped_column(default=0)
+    last_activity: Mapped[datetime | None] = mapped_column(nullable=True)
+
+
+class AccountDailyBalance(Base):
+    __tablename__ = "account_daily_balances"
+    __table_args__ = (
+        Index("ix_account_daily_balances_day", "day"),
+    )
+
+    account_id: Mapped[int] = mapped_column(ForeignKey("accounts.id"), primary_key=True)
+    day: Mapped[date] = mapped_column(primary_key=True)
+    closing_balance: Mapped[Decimal] = mapped_column(Money, nullable=False)
+    in_total: Mapped[Decimal] = mapped_column(Money, default=Decimal("0"))
+    out_total: Mapped[Decimal] = mapped_column(Money, default=Decimal("0"))
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("employee_id", "key", name="uq_idempotency_keys_employee_id_key"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    employee_id: Mapped[int] = mapped_column(ForeignKey("employees.id", ondelete="CASCADE"), nullable=False)
+    key: Mapped[str] = mapped_column(nullable=False)
+    fingerprint: Mapped[str] = mapped_column(nullable=False)
+    status_code: Mapped[int] = mapped_column(nullable=False)
+    response: Mapped[str] = mapped_column(Text, nullable=False)
+    created_on: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC), index=True)
+
+
+class TransactionArchive(Base):
+    __tablename__ = "transaction_archives"
+
+    period: Mapped[str] = mapped_column(primary_key=True)
+    lower: Mapped[datetime] = mapped_column(nullable=False, index=True)
+    upper: Mapped[datetime] = mapped_column(nullable=False)
+    path: Mapped[str] = mapped_column(nullable=False)
+    row_count: Mapped[int] = mapped_column(nullable=False)
+    first_id: Mapped[int] = mapped_column(nullable=False)
+    last_id: Mapped[int] = mapped_column(nullable=False)
+    archived_on: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        Index("ix_outbox_events_topic_id", "topic", "id"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    topic: Mapped[str] = mapped_column(nullable=False)
+    type: Mapped[str] = mapped_column(nullable=False)
+    entity_id: Mapped[int] = mapped_column(nullable=False)
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    created_on: Mapped[datetime] = mapped_column(default=lambda: datetime.now(UTC))
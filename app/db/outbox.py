@@ -0,0 +1,59 @@
+from datetime import datetime, UTC
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.db import models
+
+events_table = models.OutboxEvent.__table__
+
+# Arbitrary, but fixed: every writer must take the same advisory lock.
+OUTBOX_LOCK_KEY = 0x62616E6B62617365
+CENT = Decimal("0.01")
+
+
+# Events are inserted into the caller's transaction, so they commit or roll back
+# together with the change they describe.
+# Readers resume from the last id they saw, so ids must become visible in id order.
+# Postgres draws ids at INSERT but publishes them at COMMIT; a transaction-scoped
+# advisory lock taken before the ids are drawn and held until commit makes the two
+# orders agree. SQLite already lets only one writer in at a time.
+def record_many(db: Session, events: list[tuple[str, int, dict]]):
+    if not events:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(OUTBOX_LOCK_KEY)))
+    now = datetime.now(UTC)
+    db.execute(insert(events_table), [
+        {"topic": type.split(".")[0], "type": type, "entity_id": entity_id, "payload": payload, "created_on": now}
+        for type, entity_id, payload in events
+    ])
+
+
+def record(db: Session, type: str, entity_id: int, payload: dict):
+    record_many(db, [(type, entity_id, payload)])
+
+
+# Amounts go out as exact decimal strings, never as binary floats.
+def money(amount: Decimal) -> str:
+    return str(Decimal(amount).quantize(CENT))
+
+
+def transaction_payload(
+    id: int, sender_id: Optional[int], recv_id: Optional[int], amount: Decimal,
+    type: models.TransactionType, timestamp: datetime,
+) -> dict:
+    return {
+        "id": id, "sender_id": sender_id, "recv_id": recv_id, "amount": money(amount),
+        "type": type.value, "timestamp": timestamp.isoformat(), "reversed": False,
+    }
+
+
+# A seek on the primary key (or on (topic, id)), so every read costs the same however
+# long the outbox grows.
+def events_after(after: int, limit: int, topic: Optional[str] = None):
+    query = select(events_table).where(events_table.c.id > after)
+    if topic is not None:
+        query = query.where(events_table.c.topic == topic)
+    return query.order_by(events_table.c.id).limit(limit)
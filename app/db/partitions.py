@@ -0,0 +1,294 @@
+import heapq
+import os
+import sys
+import threading
+from datetime import datetime, UTC
+from itertools import islice
+from typing import Any, Callable, Iterator, Optional
+from sqlalchemy import create_engine, delete, func, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+
+transactions_table = models.Transaction.__table__
+
+
+def month_start(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def next_month(month: datetime) -> datetime:
+    return add_months(month, 1)
+
+
+def months_between(start: datetime, end: datetime) -> Iterator[datetime]:
+    month, last = month_start(start), month_start(end)
+    while month <= last:
+        yield month
+        month = next_month(month)
+
+
+def period_name(month: datetime) -> str:
+    return f"{month:%Y_%m}"
+
+
+def _current_month() -> datetime:
+    return month_start(datetime.now(UTC))
+
+
+# Postgres: `transactions` is range-partitioned by month with a DEFAULT partition
+# catching anything outside the pre-created range.
+
+def _partition_name(month: datetime) -> str:
+    return f"transactions_p{period_name(month)}"
+
+
+def ensure_partitions(conn: Connection, start: datetime, through: datetime) -> list[str]:
+    if conn.dialect.name != "postgresql":
+        return []
+    created = []
+    for month in months_between(start, through):
+        name = _partition_name(month)
+        if conn.scalar(text("SELECT to_regclass(:name)"), {"name": name}) is None:
+            conn.exec_driver_sql(
+                f"CREATE TABLE {name} PARTITION OF transactions "
+                f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{next_month(month):%Y-%m-%d}')"
+            )
+            created.append(name)
+    return created
+
+
+def partition_transactions(conn: Connection):
+    if conn.dialect.name != "postgresql":
+        return
+    partitioned = conn.scalar(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'transactions'::regclass"
+    ))
+    if partitioned:
+        return
+
+    # The partition key has to be part of the primary key, so the table is rebuilt.
+    for index in transactions_table.indexes:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+    conn.exec_driver_sql("ALTER TABLE transactions RENAME TO transactions_unpartitioned")
+    conn.exec_driver_sql(
+        "CREATE TABLE transactions (LIKE transactions_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        "PARTITION BY RANGE (timestamp)"
+    )
+    conn.exec_driver_sql("ALTER TABLE transactions ADD PRIMARY KEY (id, timestamp)")
+    conn.exec_driver_sql("ALTER TABLE transactions ADD FOREIGN KEY (sender_id) REFERENCES accounts (id)")
+    conn.exec_driver_sql("ALTER TABLE transactions ADD FOREIGN KEY (recv_id) REFERENCES accounts (id)")
+    conn.exec_driver_sql("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+
+    oldest = conn.scalar(text("SELECT min(timestamp) FROM transactions_unpartitioned"))
+    ensure_partitions(conn, oldest or _current_month(), add_months(_current_month(), settings.PARTITION_MONTHS_AHEAD))
+    conn.exec_driver_sql("INSERT INTO transactions SELECT * FROM transactions_unpartitioned")
+    conn.exec_driver_sql("ALTER SEQUENCE transactions_id_seq OWNED BY transactions.id")
+    conn.exec_driver_sql("DROP TABLE transactions_unpartitioned")
+    for index in transactions_table.indexes:
+        index.create(conn)
+
+
+# Archival: a closed month is copied into its own read-only SQLite file and removed
+# from the hot table. Ledger summaries keep their lifetime totals, so they are left as
+# they are; ledger.rebuild reads the archives back when it verifies them.
+
+def archive_path(month: datetime) -> str:
+    return os.path.join(settings.ARCHIVE_DIR, f"transactions_{period_name(month)}.db")
+
+
+def _write_archive(path: str, chunks: Iterator[list]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    partial = path + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+    archive_engine = create_engine(f"sqlite:///{partial}")
+    try:
+        with archive_engine.begin() as conn:
+            transactions_table.create(conn)
+            for chunk in chunks:
+                conn.execute(transactions_table.insert(), [row._asdict() for row in chunk])
+        with archive_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
+    finally:
+        archive_engine.dispose()
+    os.replace(partial, path)
+    os.chmod(path, 0o444)
+
+
+def _drop_hot_rows(db: Session, month: datetime, upper: datetime):
+    conn = db.connection()
+    name = _partition_name(month)
+    if conn.dialect.name == "postgresql" and conn.scalar(text("SELECT to_regclass(:name)"), {"name": name}):
+        conn.exec_driver_sql(f"ALTER TABLE transactions DETACH PARTITION {name}")
+        conn.exec_driver_sql(f"DROP TABLE {name}")
+        return
+    db.execute(delete(transactions_table).where(
+        transactions_table.c.timestamp >= month, transactions_table.c.timestamp < upper
+    ))
+
+
+def archive_period(db: Session, month: datetime) -> Optional[models.TransactionArchive]:
+    month = month_start(month)
+    upper = next_month(month)
+    if upper > _current_month():
+        raise ValueError(f"{period_name(month)} is not closed yet")
+    if db.get(models.TransactionArchive, period_name(month)) is not None:
+        raise ValueError(f"{period_name(month)} is already archived")
+
+    in_period = (transactions_table.c.timestamp >= month, transactions_table.c.timestamp < upper)
+    stats = db.execute(
+        select(func.count(), func.min(transactions_table.c.id), func.max(transactions_table.c.id)).where(*in_period)
+    ).one()
+    if not stats[0]:
+        return None
+    # SQLite hands out max(id) + 1, so the newest row must stay in the hot table.
+    if stats[2] == db.scalar(select(func.max(transactions_table.c.id))):
+        raise ValueError(f"{period_name(month)} holds the newest transaction")
+
+    result = db.execute(
+        select(transactions_table).where(*in_period).order_by(transactions_table.c.id)
+        .with_for_update().execution_options(yield_per=settings.BATCH_CHUNK_SIZE)
+    )
+    path = archive_path(month)
+    _write_archive(path, result.partitions())
+    _drop_hot_rows(db, month, upper)
+    archive = models.TransactionArchive(
+        period=period_name(month), lower=month, upper=upper, path=path,
+        row_count=stats[0], first_id=stats[1], last_id=stats[2],
+    )
+    db.add(archive)
+    db.flush()
+    return archive
+
+
+# Read routing: archived periods are queried through their own read-only engines with
+# the same ORM mapping, so callers get Transaction objects whichever side they came from.
+
+_archive_engines: dict[str, Engine] = {}
+_archive_engines_lock = threading.Lock()
+
+
+def _archive_engine(path: str) -> Engine:
+    with _archive_engines_lock:
+        archive_engine = _archive_engines.get(path)
+        if archive_engine is None:
+            archive_engine = _archive_engines[path] = create_engine(
+                f"sqlite:///file:{path}?mode=ro&uri=true", connect_args={"check_same_thread": False}
+            )
+        return archive_engine
+
+
+def archive_session(archive: models.TransactionArchive) -> Session:
+    return Session(bind=_archive_engine(archive.path))
+
+
+def query_archive(archive: models.TransactionArchive, fn: Callable[[Session], Any]) -> Any:
+    with archive_session(archive) as archive_db:
+        return fn(archive_db)
+
+
+def archived_periods(
+    db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> list[models.TransactionArchive]:
+    query = select(models.TransactionArchive).order_by(models.TransactionArchive.lower)
+    if start is not None:
+        query = query.where(models.TransactionArchive.upper > start)
+    if end is not None:
+        query = query.where(models.TransactionArchive.lower <= end)
+    return list(db.scalars(query))
+
+
+def _timeline_key(transaction: models.Transaction):
+    return transaction.timestamp, transaction.id
+
+
+def transactions_between(db: Session, start: datetime, end: datetime, *criteria) -> list[models.Transaction]:
+    statement = (
+        select(models.Transaction)
+        .where(models.Transaction.timestamp >= start, models.Transaction.timestamp <= end, *criteria)
+        .order_by(models.Transaction.timestamp, models.Transaction.id)
+    )
+    archives = archived_periods(db, start, end)
+    sources = [query_archive(archive, lambda archive_db: list(archive_db.scalars(statement))) for archive in archives]
+    archived = {archive.period for archive in archives}
+    if start > end or not all(period_name(month) in archived for month in months_between(start, end)):
+        sources.append(list(db.scalars(statement)))
+    return list(heapq.merge(*sources, key=_timeline_key))
+
+
+def merge_with_archives(db: Session, fn: Callable[[Session], list]) -> list[models.Transaction]:
+    sources = [query_archive(archive, fn) for archive in archived_periods(db)]
+    sources.append(fn(db))
+    return list(heapq.merge(*sources, key=_timeline_key))
+
+
+# One keyset page of `query` (a select over transaction columns including id) past
+# `after_id`, archived periods included. Archives wholly behind the cursor are skipped.
+def rows_after_id(db: Session, query, after_id: int, limit: int) -> list:
+    statement = query.where(transactions_table.c.id > after_id).order_by(transactions_table.c.id).limit(limit)
+    archives = db.scalars(
+        select(models.TransactionArchive).where(models.TransactionArchive.last_id > after_id)
+        .order_by(models.TransactionArchive.first_id)
+    ).all()
+    sources = [query_archive(archive, lambda archive_db: archive_db.execute(statement).all()) for archive in archives]
+    sources.append(db.execute(statement).all())
+    return list(islice(heapq.merge(*sources, key=lambda row: row.id), limit))
+
+
+def find_archived(db: Session, transaction_id: int) -> Optional[models.TransactionArchive]:
+    candidates = db.scalars(select(models.TransactionArchive).where(
+        models.TransactionArchive.first_id <= transaction_id, models.TransactionArchive.last_id >= transaction_id
+    )).all()
+    lookup = select(transactions_table.c.id).where(transactions_table.c.id == transaction_id)
+    for archive in candidates:
+        if query_archive(archive, lambda archive_db: archive_db.scalar(lookup)) is not None:
+            return archive
+    return None
+
+
+def main(argv: list[str]) -> int:
+    from app.db.database import SessionLocal
+
+    if argv == ["maintain"]:
+        with SessionLocal() as db:
+            created = ensure_partitions(db.connection(), _current_month(), add_months(_current_month(), settings.PARTITION_MONTHS_AHEAD))
+            db.commit()
+        print("\n".join(created) if created else "Partitions are up to date")
+        return 0
+    if argv != ["archive"]:
+        print("usage: python -m app.db.partitions archive|maintain")
+        return 2
+
+    cutoff = add_months(_current_month(), -settings.ARCHIVE_AFTER_MONTHS)
+    with SessionLocal() as db:
+        oldest = db.scalar(select(func.min(transactions_table.c.timestamp)))
+        if oldest is None or oldest >= cutoff:
+            print("Nothing to archive")
+            return 0
+        for month in months_between(oldest, add_months(cutoff, -1)):
+            if db.get(models.TransactionArchive, period_name(month)) is not None:
+                continue
+            try:
+                archive = archive_period(db, month)
+            except ValueError as e:
+                print(e)
+                db.rollback()
+                continue
+            db.commit()
+            if archive is not None:
+                print(f"{archive.period}: {archive.row_count} transactions -> {archive.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,241 @@
+from datetime import datetime, UTC
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.db import account_state, ledger, models, outbox, partitions
+
+
+class PostingError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _guarded_update(db: Session, account_id: int, delta: Decimal, state: Optional[account_state.AccountState]):
+    stmt = (
+        update(models.Account)
+        .where(models.Account.id == account_id, models.Account.is_active.is_(True))
+        .values(balance=models.Account.balance + delta)
+        .returning(models.Account.version)
+    )
+    if state is not None:
+        stmt = stmt.where(models.Account.version == state.version)
+    if delta < 0:
+        stmt = stmt.where(models.Account.balance >= -delta)
+    return db.execute(stmt).scalar()
+
+
+def _move_balances(db: Session, sender_id: Optional[int], recv_id: Optional[int], amount: Decimal):
+    changes = []
+    if sender_id is not None:
+        changes.append((sender_id, -amount, "Sender"))
+    if recv_id is not None:
+        changes.append((recv_id, amount, "Receiver"))
+
+    # Inactive accounts known to the state cache are rejected before touching the database.
+    for account_id, _, role in changes:
+        state = account_state.cached(account_id)
+        if state is not None and not state.is_active:
+            raise PostingError(400, f"{role} account is inactive")
+
+    # Touch rows in id order so opposing transfers cannot deadlock on Postgres.
+    # The guarded UPDATE takes the row lock and checks status, version and funds in
+    # one round trip; only a miss costs a second query to find out why.
+    for account_id, delta, role in sorted(changes):
+        state = account_state.cached(account_id)
+        while True:
+            version = _guarded_update(db, account_id, delta, state)
+            if version is not None:
+                account_state.remember(account_id, True, version)
+                break
+            current = account_state.load(db, account_id)
+            if current is None:
+                raise PostingError(404, f"{role} account not found")
+            if not current.is_active:
+                raise PostingError(400, f"{role} account is inactive")
+            if state is None or current.version == state.version:
+                raise PostingError(400, "Insufficient funds")
+            state = current
+
+
+def post_transaction(
+    db: Session,
+    sender_id: Optional[int],
+    recv_id: Optional[int],
+    amount: Decimal,
+    type: models.TransactionType,
+) -> models.Transaction:
+    try:
+        _move_balances(db, sender_id, recv_id, amount)
+    except PostingError:
+        db.rollback()
+        raise
+
+    timestamp = datetime.now(UTC)
+    ledger.record_postings(db, [(sender_id, recv_id, amount, timestamp)])
+    transaction = models.Transaction(
+        sender_id=sender_id,
+        recv_id=recv_id,
+        amount=amount,
+        type=type,
+        timestamp=timestamp,
+    )
+    db.add(transaction)
+    db.flush()
+    outbox.record(db, "transaction.posted", transaction.id, outbox.transaction_payload(
+        transaction.id, sender_id, recv_id, amount, type, timestamp
+    ))
+    return transaction
+
+
+def reverse_transaction(db: Session, original: models.Transaction) -> models.Transaction:
+    marked = db.execute(
+        update(models.Transaction)
+        .where(models.Transaction.id == original.id, models.Transaction.reversed.is_(False))
+        .values(reversed=True)
+    )
+    if marked.rowcount == 0:
+        db.rollback()
+        raise PostingError(400, "Transaction is already reversed")
+
+    reversal = post_transaction(
+        db,
+        sender_id=original.recv_id,
+        recv_id=original.sender_id,
+        amount=original.amount,
+        type=models.TransactionType.reversal,
+    )
+    outbox.record(db, "transaction.reversed", original.id, {"id": original.id, "reversal_id": reversal.id})
+    return reversal
+
+
+# Posts (index, sender_id, recv_id, amount, type) rows with one IN lookup, one
+# executemany UPDATE and one executemany INSERT. Returns (index, id, error) per row.
+# Row locks are taken in id order, like _move_balances, so concurrent batches with
+# overlapping accounts cannot deadlock.
+def post_batch(db: Session, items: list[tuple]) -> list[tuple]:
+    account_ids = {account_id for _, sender_id, recv_id, _, _ in items for account_id in (sender_id, recv_id)}
+    account_ids.discard(None)
+    balances = {}
+    inactive = set()
+    for row in db.execute(
+        select(models.Account.id, models.Account.balance, models.Account.is_active, models.Account.version)
+        .where(models.Account.id.in_(account_ids))
+        .order_by(models.Account.id)
+        .with_for_update()
+    ):
+        balances[row.id] = row.balance
+        if not row.is_active:
+            inactive.add(row.id)
+        account_state.remember(row.id, row.is_active, row.version)
+
+    deltas = {}
+    accepted = []
+    outcomes = {}
+    now = datetime.now(UTC)
+    for index, sender_id, recv_id, amount, type in items:
+        if sender_id is not None and sender_id not in balances:
+            outcomes[index] = PostingError(404, "Sender account not found")
+        elif recv_id is not None and recv_id not in balances:
+            outcomes[index] = PostingError(404, "Receiver account not found")
+        elif sender_id in inactive:
+            outcomes[index] = PostingError(400, "Sender account is inactive")
+        elif recv_id in inactive:
+            outcomes[index] = PostingError(400, "Receiver account is inactive")
+        elif sender_id is not None and balances[sender_id] < amount:
+            outcomes[index] = PostingError(400, "Insufficient funds")
+        else:
+            for account_id, delta in ((sender_id, -amount), (recv_id, amount)):
+                if account_id is not None:
+                    balances[account_id] += delta
+                    deltas[account_id] = deltas.get(account_id, 0) + delta
+            accepted.append((index, {
+                "sender_id": sender_id,
+                "recv_id": recv_id,
+                "amount": amount,
+                "type": type,
+                "timestamp": now,
+                "reversed": False,
+            }))
+
+    if accepted:
+        accounts = models.Account.__table__
+        db.execute(
+            update(accounts)
+            .where(accounts.c.id == bindparam("account_id"))
+            .values(balance=accounts.c.balance + bindparam("delta")),
+            [{"account_id": account_id, "delta": delta} for account_id, delta in sorted(deltas.items())],
+        )
+        ledger.record_postings(db, [
+            (row["sender_id"], row["recv_id"], row["amount"], row["timestamp"]) for _, row in accepted
+        ])
+        ids = db.scalars(
+            insert(models.Transaction).returning(models.Transaction.id, sort_by_parameter_order=True),
+            [row for _, row in accepted],
+        ).all()
+        for (index, _), transaction_id in zip(accepted, ids):
+            outcomes[index] = transaction_id
+        outbox.record_many(db, [
+            ("transaction.posted", transaction_id, outbox.transaction_payload(
+                transaction_id, row["sender_id"], row["recv_id"], row["amount"], row["type"], row["timestamp"]
+            ))
+            for (_, row), transaction_id in zip(accepted, ids)
+        ])
+
+    results = []
+    for index, *_ in items:
+        outcome = outcomes[index]
+        if isinstance(outcome, PostingError):
+            results.append((index, None, outcome))
+        else:
+            results.append((index, outcome, None))
+    return results
+
+
+# Reverses every transaction matching `criteria` set-wise. One UPDATE ... RETURNING
+# claims the reversible originals, post_batch moves the money and bulk-inserts the
+# reversal rows, and originals whose reversal failed are released again.
+# Returns (original_id, reversal_id, error) per claimed id, or per requested id.
+def reverse_batch(db: Session, criteria: list, requested_ids: Optional[list[int]] = None) -> list[tuple]:
+    tx = models.Transaction.__table__
+    claimed = sorted(db.execute(
+        update(tx)
+        .where(*criteria, tx.c.reversed.is_(False), tx.c.type != models.TransactionType.reversal)
+        .values(reversed=True)
+        .returning(tx.c.id, tx.c.sender_id, tx.c.recv_id, tx.c.amount)
+    ).all())
+
+    posted = post_batch(db, [
+        (row.id, row.recv_id, row.sender_id, row.amount, models.TransactionType.reversal) for row in claimed
+    ])
+    failed = [original_id for original_id, _, error in posted if error]
+    if failed:
+        db.execute(update(tx).where(tx.c.id.in_(failed)).values(reversed=False))
+    outbox.record_many(db, [
+        ("transaction.reversed", original_id, {"id": original_id, "reversal_id": reversal_id})
+        for original_id, reversal_id, error in posted if not error
+    ])
+    results = {result[0]: result for result in posted}
+    if requested_ids is None:
+        return [results[row.id] for row in claimed]
+
+    requested = list(dict.fromkeys(requested_ids))
+    unclaimed = [original_id for original_id in requested if original_id not in results]
+    if unclaimed:
+        found = {row.id: row for row in db.execute(select(tx.c.id, tx.c.type).where(tx.c.id.in_(unclaimed)))}
+        for original_id in unclaimed:
+            row = found.get(original_id)
+            archive = partitions.find_archived(db, original_id) if row is None else None
+            if archive is not None:
+                error = PostingError(409, f"Transaction is archived in {archive.period} and can no longer be reversed")
+            elif row is None:
+                error = PostingError(404, "Transaction not found")
+            elif row.type == models.TransactionType.reversal:
+                error = PostingError(400, "Cannot reverse a reversal transaction")
+            else:
+                error = PostingError(400, "Transaction is already reversed")
+            results[original_id] = (original_id, None, error)
+    return [results[original_id] for original_id in requested]
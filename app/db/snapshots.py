@@ -0,0 +1,200 @@
+import sys
+from datetime import date, datetime, time, timedelta, UTC
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import BigInteger, Date, func, insert, literal, select, type_coerce, union_all
+from sqlalchemy.orm import Session
+
+from app.db import models, partitions, statements
+from app.db.types import Money
+
+accounts_table = models.Account.__table__
+snapshots_table = models.AccountDailyBalance.__table__
+transactions_table = models.Transaction.__table__
+
+SNAPSHOT_COLUMNS = ["account_id", "day", "closing_balance", "in_total", "out_total"]
+ONE_DAY = timedelta(days=1)
+
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+def closes_at(day: date) -> datetime:
+    return day_start(day + ONE_DAY)
+
+
+def naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        value = value.astimezone(UTC).replace(tzinfo=None)
+    return value
+
+
+def _last_closed_day() -> date:
+    return datetime.now(UTC).date() - ONE_DAY
+
+
+# Per-account cents received and sent over [lower, upper), from one range scan of the
+# timestamp index.
+def _flows(lower: datetime, upper: Optional[datetime] = None):
+    tx = transactions_table
+    window = [tx.c.timestamp >= lower]
+    if upper is not None:
+        window.append(tx.c.timestamp < upper)
+    amount = type_coerce(tx.c.amount, BigInteger)
+    legs = union_all(
+        select(tx.c.recv_id.label("account_id"), amount.label("in_cents"), literal(0).label("out_cents"))
+        .where(tx.c.recv_id.is_not(None), *window),
+        select(tx.c.sender_id, literal(0), amount).where(tx.c.sender_id.is_not(None), *window),
+    ).subquery()
+    return (
+        select(
+            legs.c.account_id,
+            func.sum(legs.c.in_cents).label("in_cents"),
+            func.sum(legs.c.out_cents).label("out_cents"),
+        )
+        .group_by(legs.c.account_id)
+        .subquery()
+    )
+
+
+def _has_snapshot(db: Session, day: date) -> bool:
+    return db.scalar(select(snapshots_table.c.day).where(snapshots_table.c.day == day).limit(1)) is not None
+
+
+# The newest day is rolled back from live balances; every earlier day is rolled back
+# from the snapshot after it, so each day only scans its own successor's transactions.
+def snapshot_day(db: Session, day: date) -> int:
+    lower, upper = day_start(day), closes_at(day)
+    if partitions.archived_periods(db, lower):
+        raise ValueError(f"{day} falls before an archived period")
+
+    during = _flows(lower, upper)
+    if _has_snapshot(db, day + ONE_DAY):
+        following = _flows(upper, upper + ONE_DAY)
+        base = snapshots_table.alias("next_day")
+        closing = type_coerce(base.c.closing_balance, BigInteger)
+        source = base.join(accounts_table, accounts_table.c.id == base.c.account_id)
+        criteria = [base.c.day == day + ONE_DAY]
+        account_id = base.c.account_id
+    else:
+        following = _flows(upper)
+        closing = type_coerce(accounts_table.c.balance, BigInteger)
+        source = accounts_table
+        criteria = []
+        account_id = accounts_table.c.id
+
+    query = (
+        select(
+            account_id,
+            literal(day, Date),
+            closing - func.coalesce(following.c.in_cents, 0) + func.coalesce(following.c.out_cents, 0),
+            func.coalesce(during.c.in_cents, 0),
+            func.coalesce(during.c.out_cents, 0),
+        )
+        .select_from(
+            source
+            .outerjoin(following, following.c.account_id == account_id)
+            .outerjoin(during, during.c.account_id == account_id)
+        )
+        .where(accounts_table.c.created_on < upper, *criteria)
+    )
+    return db.execute(insert(snapshots_table).from_select(SNAPSHOT_COLUMNS, query)).rowcount
+
+
+def snapshot_days(db: Session, through: Optional[date] = None, since: Optional[date] = None) -> list[date]:
+    through = through or _last_closed_day()
+    if through > _last_closed_day():
+        raise ValueError(f"{through} is not closed yet")
+    if since is None:
+        latest = db.scalar(select(func.max(snapshots_table.c.day)))
+        since = latest + ONE_DAY if latest is not None else through
+
+    taken = []
+    day = through
+    while day >= since:
+        if not _has_snapshot(db, day):
+            snapshot_day(db, day)
+            taken.append(day)
+        day -= ONE_DAY
+    return taken
+
+
+# Point in time: the balance just before `as_of`, from the nearest snapshot on either
+# side plus the transactions between it and `as_of`.
+def balance_as_of(db: Session, account_id: int, as_of: datetime) -> tuple[Decimal, Optional[date]]:
+    as_of = naive_utc(as_of)
+    snapshot = models.AccountDailyBalance
+    before = db.scalars(
+        select(snapshot).where(snapshot.account_id == account_id, snapshot.day < as_of.date())
+        .order_by(snapshot.day.desc()).limit(1)
+    ).first()
+    after = db.scalars(
+        select(snapshot).where(snapshot.account_id == account_id, snapshot.day >= as_of.date())
+        .order_by(snapshot.day).limit(1)
+    ).first()
+
+    if before is not None and (after is None or as_of - closes_at(before.day) <= closes_at(after.day) - as_of):
+        net = statements.net_cents_between(db, account_id, closes_at(before.day), as_of)
+        return before.closing_balance + Decimal(net).scaleb(-2), before.day
+    if after is not None:
+        net = statements.net_cents_between(db, account_id, as_of, closes_at(after.day))
+        return after.closing_balance - Decimal(net).scaleb(-2), after.day
+    return statements.opening_balance(db, account_id, as_of), None
+
+
+# Amount moved per transaction type over [lower, upper), archived periods included.
+# in_total/out_total count every leg, so a transfer shows up on both sides; these say
+# how much actually entered or left the bank.
+def _type_totals(db: Session, lower: datetime, upper: datetime) -> dict[str, Decimal]:
+    tx = transactions_table
+    query = (
+        select(tx.c.type, func.sum(type_coerce(tx.c.amount, BigInteger)))
+        .where(tx.c.timestamp >= lower, tx.c.timestamp < upper)
+        .group_by(tx.c.type)
+    )
+    cents = dict.fromkeys(models.TransactionType, 0)
+    sources = [db.execute(query).all()]
+    for archive in partitions.archived_periods(db, lower, upper):
+        sources.append(partitions.query_archive(archive, lambda archive_db: archive_db.execute(query).all()))
+    for rows in sources:
+        for type, total in rows:
+            cents[type] += int(total)
+    return {f"{type.value}_total": Decimal(total).scaleb(-2) for type, total in cents.items()}
+
+
+def bank_totals(db: Session, day: date) -> Optional[dict]:
+    snapshot = models.AccountDailyBalance
+    row = db.execute(
+        select(
+            func.count().label("accounts"),
+            type_coerce(func.sum(snapshot.closing_balance), Money).label("closing_balance"),
+            type_coerce(func.sum(snapshot.in_total), Money).label("in_total"),
+            type_coerce(func.sum(snapshot.out_total), Money).label("out_total"),
+        ).where(snapshot.day == day)
+    ).one()
+    if not row.accounts:
+        return None
+    return {"day": day, **row._asdict(), **_type_totals(db, day_start(day), closes_at(day))}
+
+
+def main(argv: list[str]) -> int:
+    from app.db.database import SessionLocal
+
+    if len(argv) > 1:
+        print("usage: python -m app.db.snapshots [since YYYY-MM-DD]")
+        return 2
+    since = date.fromisoformat(argv[0]) if argv else None
+    with SessionLocal() as db:
+        try:
+            taken = snapshot_days(db, since=since)
+        except ValueError as e:
+            print(e)
+            return 1
+        db.commit()
+    print("\n".join(f"{day}: snapshot taken" for day in sorted(taken)) if taken else "Snapshots are up to date")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,107 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Iterator, Optional
+from sqlalchemy import BigInteger, case, func, or_, select, text, type_coerce, union_all
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models, partitions
+
+transactions_table = models.Transaction.__table__
+
+COLUMNS = ("id", "timestamp", "type", "sender_id", "recv_id", "amount", "balance")
+
+
+def _cents_to_money(cents) -> Decimal:
+    return Decimal(int(cents)).scaleb(-2)
+
+
+# Same two index seeks as the by-account listing; self-transfers appear once.
+def _account_rows(account_id: int, *criteria):
+    tx = transactions_table
+    sent = select(tx).where(tx.c.sender_id == account_id, *criteria)
+    received = select(tx).where(
+        tx.c.recv_id == account_id,
+        or_(tx.c.sender_id.is_(None), tx.c.sender_id != account_id),
+        *criteria,
+    )
+    return union_all(sent, received).subquery()
+
+
+def _signed_cents(rows, account_id: int):
+    amount = type_coerce(rows.c.amount, BigInteger)
+    return (
+        case((rows.c.recv_id == account_id, amount), else_=0)
+        - case((rows.c.sender_id == account_id, amount), else_=0)
+    )
+
+
+def _net_cents_between(db: Session, account_id: int, start: datetime, end: Optional[datetime] = None) -> int:
+    criteria = [transactions_table.c.timestamp >= start]
+    if end is not None:
+        criteria.append(transactions_table.c.timestamp < end)
+    rows = _account_rows(account_id, *criteria)
+    return int(db.scalar(select(func.coalesce(func.sum(_signed_cents(rows, account_id)), 0))))
+
+
+# Net movement in cents over [start, end), archived periods included.
+def net_cents_between(db: Session, account_id: int, start: datetime, end: Optional[datetime] = None) -> int:
+    net = _net_cents_between(db, account_id, start, end)
+    for archive in partitions.archived_periods(db, start, end):
+        net += partitions.query_archive(archive, lambda archive_db: _net_cents_between(archive_db, account_id, start, end))
+    return net
+
+
+# The opening balance and the statement rows are separate queries, so they must share
+# one snapshot: a posting committed in between would otherwise show up in the rows but
+# not in the opening balance. Postgres gives every READ COMMITTED statement a fresh
+# snapshot, so the session runs REPEATABLE READ instead; SQLite holds one snapshot for
+# as long as a read transaction is open, but the driver only opens one for writes.
+# Must be called before the session runs its first query.
+def begin_snapshot(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    else:
+        db.execute(text("BEGIN"))
+
+
+def opening_balance(db: Session, account_id: int, start: datetime) -> Decimal:
+    balance = db.scalar(select(models.Account.balance).where(models.Account.id == account_id))
+    return balance - _cents_to_money(net_cents_between(db, account_id, start))
+
+
+def _statement_query(account_id: int, start: datetime, end: datetime, opening_cents: int):
+    tx = transactions_table
+    rows = _account_rows(account_id, tx.c.timestamp >= start, tx.c.timestamp <= end)
+    signed = _signed_cents(rows, account_id)
+    running = func.sum(signed).over(order_by=(rows.c.timestamp, rows.c.id), rows=(None, 0))
+    return (
+        select(
+            rows.c.id, rows.c.timestamp, rows.c.type, rows.c.sender_id, rows.c.recv_id,
+            signed.label("amount"), (running + opening_cents).label("balance"),
+        )
+        .order_by(rows.c.timestamp, rows.c.id)
+        .execution_options(yield_per=settings.STREAM_CHUNK_SIZE)
+    )
+
+
+def _source_chunks(db: Session, account_id: int, start: datetime, end: datetime, carry: list) -> Iterator[list[tuple]]:
+    for chunk in db.execute(_statement_query(account_id, start, end, carry[0])).partitions():
+        carry[0] = int(chunk[-1].balance)
+        yield [
+            (row.id, row.timestamp, row.type.value, row.sender_id, row.recv_id,
+             _cents_to_money(row.amount), _cents_to_money(row.balance))
+            for row in chunk
+        ]
+
+
+# Yields statement rows in chunks: archived periods first, then the hot table, each
+# running its own window sum seeded with the closing balance of the previous one.
+def statement_chunks(
+    db: Session, account_id: int, start: datetime, end: datetime, opening: Decimal
+) -> Iterator[list[tuple]]:
+    carry = [int(opening.scaleb(2))]
+    for archive in partitions.archived_periods(db, start, end):
+        with partitions.archive_session(archive) as archive_db:
+            yield from _source_chunks(archive_db, account_id, start, end, carry)
+    yield from _source_chunks(db, account_id, start, end, carry)
@@ -0,0 +1,21 @@
+from decimal import Decimal, ROUND_HALF_EVEN
+from sqlalchemy import BigInteger
+from sqlalchemy.types import TypeDecorator
+
+
+class Money(TypeDecorator):
+    # Amounts are Decimal in Python and integer minor units (cents) in the database.
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, Decimal):
+            value = Decimal(str(value))
+        return int(value.scaleb(2).to_integral_value(ROUND_HALF_EVEN))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return Decimal(int(value)).scaleb(-2)
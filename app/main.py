@@ -1,14 +1,62 @@
-from fastapi import FastAPI
+import math
+from contextlib import asynccontextmanager
+from anyio import to_thread
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 
-from app.api import auth, employee, account, transaction
+from app.api import auth, employee, account, transaction, events
+from app.core import instrumentation, metrics, ratelimit, security
+from app.core.config import settings
+from app.db.database import async_engine, async_read_engine
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Database work runs on the event loop through run_sync. anyio's worker threads are
+    # left with the shared rate-limit store calls, the form dependency on login and the
+    # few plain `def` handlers; size that pool explicitly.
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    yield
+    security.shutdown_hashing_pool()
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(auth.ReadAfterWriteMiddleware)
+
+if settings.METRICS_ENABLED:
+    instrumentation.install_sql_listeners()
+    app.add_middleware(instrumentation.MetricsMiddleware)
+
+# Added last so it runs outermost: shed requests are turned away before any other work.
+app.add_middleware(ratelimit.AdmissionMiddleware)
 
 app.include_router(auth.router)
 app.include_router(employee.router)
 app.include_router(account.router)
 app.include_router(transaction.router)
+app.include_router(events.router)
+
+@app.exception_handler(security.HashingOverloaded)
+def hashing_overloaded(request: Request, exc: security.HashingOverloaded):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+@app.exception_handler(ratelimit.RateLimited)
+def rate_limited(request: Request, exc: ratelimit.RateLimited):
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Rate limit exceeded"},
+        headers={"Retry-After": str(math.ceil(exc.retry_after))},
+    )
 
 @app.get("/")
 def root():
     return {"message": "BankBase API is running"}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,6 +1,9 @@
 from pydantic import BaseModel, EmailStr, ConfigDict
 from typing import Optional
-from datetime import datetime
+from datetime import date, datetime
+from decimal import Decimal
+
+from app.schemas.types import Money
 
 
 class AccountBase(BaseModel):
@@ -11,22 +14,54 @@ class AccountBase(BaseModel):
 
 
 class AccountCreate(AccountBase):
-    balance: float = 0.0
+    balance: Money = Decimal("0")
 
 
+# Balances only move through postings, so they can't be edited here.
 class AccountUpdate(BaseModel):
     name: Optional[str] = None
     email: Optional[EmailStr] = None
     phone: Optional[str] = None
     PID: Optional[str] = None
-    balance: Optional[float] = None
     is_active: Optional[bool] = None
 
+    model_config = ConfigDict(extra="forbid")
+
 
 class Account(AccountBase):
     id: int
-    balance: float
+    balance: Money
     created_on: datetime
     is_active: bool
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class AccountSummary(BaseModel):
+    account_id: int
+    total_in: Money = Decimal("0")
+    total_out: Money = Decimal("0")
+    count_in: int = 0
+    count_out: int = 0
+    last_activity: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AccountBalance(BaseModel):
+    account_id: int
+    as_of: datetime
+    balance: Money
+    snapshot_day: Optional[date] = None
+
+
+class BankDailyTotals(BaseModel):
+    day: date
+    accounts: int
+    closing_balance: Money
+    in_total: Money
+    out_total: Money
+    deposit_total: Money
+    withdrawal_total: Money
+    transfer_total: Money
+    reversal_total: Money
@@ -0,0 +1,16 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Any, List
+from datetime import datetime
+
+class Event(BaseModel):
+    id: int
+    topic: str
+    type: str
+    entity_id: int
+    payload: Any
+    created_on: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+class EventBatch(BaseModel):
+    events: List[Event]
+    next_offset: int
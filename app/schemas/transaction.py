@@ -1,8 +1,10 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, model_validator
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
+from app.schemas.types import Money
+
 class TransactionType(str, Enum):
     deposit = "deposit"
     withdrawal = "withdrawal"
@@ -12,7 +14,7 @@ class TransactionType(str, Enum):
 class TransactionBase(BaseModel):
     sender_id: Optional[int] = None
     recv_id: Optional[int] = None
-    amount: float
+    amount: Money
     type: TransactionType
 
 class TransactionCreate(TransactionBase):
@@ -27,3 +29,40 @@ class Transaction(TransactionBase):
 class ReversalResult(BaseModel):
     original: Transaction
     reversal: Transaction
+
+class BatchRowResult(BaseModel):
+    index: int
+    status_code: int
+    id: Optional[int] = None
+    detail: Optional[str] = None
+
+class BatchResult(BaseModel):
+    posted: int
+    failed: int
+    results: List[BatchRowResult]
+
+class ReverseBatchRequest(BaseModel):
+    ids: Optional[List[int]] = None
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    account_id: Optional[int] = None
+
+    @model_validator(mode="after")
+    def one_selection(self):
+        if self.ids is not None:
+            if self.start or self.end or self.account_id is not None:
+                raise ValueError("Give either ids or a start/end filter, not both")
+        elif self.start is None or self.end is None:
+            raise ValueError("Give ids or both start and end")
+        return self
+
+class ReverseBatchRowResult(BaseModel):
+    id: int
+    status_code: int
+    reversal_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class ReverseBatchResult(BaseModel):
+    reversed: int
+    failed: int
+    results: List[ReverseBatchRowResult]
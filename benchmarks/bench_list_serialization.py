@@ -0,0 +1,78 @@
+"""ORM + per-row pydantic validation vs. column projection + direct JSON encoding.
+
+    python -m benchmarks.bench_list_serialization --rows 100000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.api import fastjson
+from app.db import models
+from app.schemas import transaction as transaction_schema
+
+
+def seed(engine, rows: int):
+    models.Base.metadata.create_all(engine)
+    start = datetime(2024, 1, 1)
+    with Session(engine) as db:
+        db.execute(insert(models.Account), [
+            {"id": 1, "PID": "P1", "name": "A", "email": "a@bench", "balance": Decimal("0")},
+            {"id": 2, "PID": "P2", "name": "B", "email": "b@bench", "balance": Decimal("0")},
+        ])
+        db.execute(insert(models.Transaction), [
+            {
+                "sender_id": 1, "recv_id": 2, "amount": Decimal(i % 10000) / 100,
+                "timestamp": start + timedelta(seconds=i), "reversed": False,
+                "type": models.TransactionType.transfer,
+            }
+            for i in range(rows)
+        ])
+        db.commit()
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    seed(engine, args.rows)
+    adapter = TypeAdapter(List[transaction_schema.Transaction])
+
+    def response_model_path():
+        with Session(engine) as db:
+            transactions = db.query(models.Transaction).all()
+            return adapter.dump_json(adapter.validate_python(transactions, from_attributes=True))
+
+    def fast_path():
+        with Session(engine) as db:
+            result = db.connection().execute(
+                select(*fastjson.schema_columns(transaction_schema.Transaction, models.Transaction))
+            )
+            return fastjson.encode_rows(list(result.keys()), result)
+
+    slow, fast = timed(response_model_path, args.repeat), timed(fast_path, args.repeat)
+    print(f"response_model  {slow * 1000:10.1f} ms")
+    print(f"fast path       {fast * 1000:10.1f} ms")
+    print(f"speedup         {slow / fast:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
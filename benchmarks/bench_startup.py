@@ -0,0 +1,67 @@
+"""Cold import cost of the app, from `python -X importtime`, against a budget.
+
+    python -m benchmarks.bench_startup --budget-ms 2000 --top 15
+
+Exits non-zero when the median import time exceeds the budget or one of the
+lazily loaded stacks (jose, passlib) is pulled in by `import app.main`.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+LAZY_PACKAGES = ("jose", "passlib")
+
+
+def import_profile(module: str) -> list[tuple[int, int, str]]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=2000)
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    totals = [
+        next(cumulative for _, cumulative, name in profile if name.strip() == args.module) / 1000
+        for profile in profiles
+    ]
+    last = profiles[-1]
+
+    # Direct imports of the module are the depth-1 entries listed just before it.
+    children = []
+    for entry in reversed(last[:-1]):
+        depth = (len(entry[2]) - len(entry[2].lstrip())) // 2
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append(entry)
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for self_us, cumulative_us, name in sorted(children, key=lambda entry: -entry[1])[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {name.strip()}")
+
+    median = statistics.median(totals)
+    print(f"\nimport {args.module}: median {median:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    loaded = sorted({name.strip().split(".")[0] for _, _, name in last} & set(LAZY_PACKAGES))
+    if loaded:
+        print(f"eagerly imported: {', '.join(loaded)}")
+    sys.exit(1 if median > args.budget_ms or loaded else 0)
+
+
+if __name__ == "__main__":
+    main()
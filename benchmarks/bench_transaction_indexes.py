@@ -0,0 +1,135 @@
+"""Scan vs. seek for the by-account and by-date transaction lookups.
+
+    python -m benchmarks.bench_transaction_indexes --rows 10000000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.api.transaction import account_transactions_query
+from app.db import models
+
+INDEXES = (
+    "ix_transactions_sender_id_timestamp",
+    "ix_transactions_recv_id_timestamp",
+    "ix_transactions_timestamp",
+)
+
+
+def seed(path: str, rows: int, accounts: int):
+    engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO accounts (id, PID, name, email, balance, created_on, is_active) VALUES (?, ?, ?, ?, 0, ?, 1)",
+        ((i, f"PID{i}", f"Account {i}", f"a{i}@bench", datetime(2020, 1, 1)) for i in range(1, accounts + 1)),
+    )
+    start = datetime(2020, 1, 1)
+    spacing = timedelta(days=5 * 365) / rows
+    rng = random.Random(42)
+
+    def generate():
+        for i in range(1, rows + 1):
+            yield (
+                i,
+                rng.randint(1, accounts),
+                rng.randint(1, accounts),
+                100,
+                start + spacing * i,
+                0,
+                "transfer",
+            )
+
+    conn.executemany(
+        "INSERT INTO transactions (id, sender_id, recv_id, amount, timestamp, reversed, type) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        generate(),
+    )
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(path: str, accounts: int, repeat: int):
+    engine = create_engine(f"sqlite:///{path}")
+    rng = random.Random(7)
+    account_id = rng.randint(1, accounts)
+    day_start = datetime(2022, 6, 1)
+    day_end = day_start + timedelta(days=1)
+
+    with Session(engine) as db:
+        def by_account_or():
+            db.query(models.Transaction).filter(
+                (models.Transaction.sender_id == account_id) | (models.Transaction.recv_id == account_id)
+            ).all()
+            db.expunge_all()
+
+        def by_account_union():
+            account_transactions_query(db, account_id).all()
+            db.expunge_all()
+
+        def by_date():
+            db.query(models.Transaction).filter(
+                models.Transaction.timestamp >= day_start, models.Transaction.timestamp <= day_end
+            ).all()
+            db.expunge_all()
+
+        results = {}
+        conn = db.connection()
+        for name in INDEXES:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+        results["by_account_scan"] = timed(by_account_or, repeat)
+        results["by_date_scan"] = timed(by_date, repeat)
+
+        for table_index in models.Transaction.__table__.indexes:
+            if table_index.name in INDEXES:
+                table_index.create(conn)
+        conn.exec_driver_sql("ANALYZE")
+        results["by_account_seek"] = timed(by_account_union, repeat)
+        results["by_date_seek"] = timed(by_date, repeat)
+        db.commit()
+
+    for label, seconds in results.items():
+        print(f"{label:<18} {seconds * 1000:10.2f} ms")
+    for query in ("account", "date"):
+        scan, seek = results[f"by_{query}_scan"], results[f"by_{query}_seek"]
+        print(f"by_{query} speedup: {scan / seek:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--accounts", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--db", help="Reuse an already seeded database file")
+    args = parser.parse_args()
+
+    if args.db:
+        run(args.db, args.accounts, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        print(f"Seeding {args.rows} transactions across {args.accounts} accounts...")
+        seed(path, args.rows, args.accounts)
+        run(path, args.accounts, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
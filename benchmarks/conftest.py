@@ -0,0 +1,80 @@
+import itertools
+import os
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.api.auth import get_read_db, user_cache
+from app.core import ratelimit
+from app.db.database import create_async_db_engine, create_db_engine, get_async_db, get_db
+from app.db.migrations import upgrade
+from benchmarks.seed import ADMIN, CLERK, seed
+
+BENCH_ACCOUNTS = int(os.getenv("BENCH_ACCOUNTS", 1000))
+BENCH_TRANSACTIONS = int(os.getenv("BENCH_TRANSACTIONS", 20000))
+
+
+@pytest.fixture(scope="session")
+def seeded(tmp_path_factory):
+    url = f"sqlite:///{tmp_path_factory.mktemp('bench') / 'bench.db'}"
+    engine = create_db_engine(url)
+    upgrade(engine)
+    BenchSessionLocal = sessionmaker(bind=engine, autoflush=False)
+    with BenchSessionLocal() as db:
+        data = seed(db, BENCH_ACCOUNTS, BENCH_TRANSACTIONS)
+
+    async_engine = create_async_db_engine(url, poolclass=NullPool)
+    BenchAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def override_get_db():
+        db = BenchSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with BenchAsyncSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_async_db
+    user_cache.clear()
+    # Every benchmark drives one endpoint with one token far past any per-employee budget.
+    budgets = dict(ratelimit.budgets)
+    ratelimit.budgets.update(dict.fromkeys(budgets))
+    yield data
+    ratelimit.budgets.update(budgets)
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client(seeded):
+    return TestClient(app)
+
+
+def _login(client, email, password):
+    response = client.post("/auth/login", data={"username": email, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return _login(client, *ADMIN)
+
+
+@pytest.fixture(scope="session")
+def clerk_headers(client):
+    return _login(client, *CLERK)
+
+
+@pytest.fixture(scope="session")
+def unique():
+    counter = itertools.count()
+    return lambda: next(counter)
@@ -0,0 +1,197 @@
+"""Concurrent load driver: seeds a database, serves the app with an in-process
+uvicorn and drives each scenario with asyncio + httpx.
+
+    python -m benchmarks.load --out load.json
+    python -m benchmarks.load --out load-new.json --compare load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _drive(base_url: str, headers: dict, make_request, concurrency: int, duration: float) -> dict:
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client: httpx.AsyncClient, rng: random.Random):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            try:
+                method, url, kwargs = make_request(rng)
+            except StopIteration:
+                return
+            started = time.perf_counter()
+            # A dropped connection is a failed request, not a reason to stop the scenario.
+            try:
+                response = await client.request(method, url, headers=headers, **kwargs)
+            except httpx.TransportError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, random.Random(i)) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000 if latencies else None,
+        "p99_ms": _percentile(latencies, 99) * 1000 if latencies else None,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else None,
+    }
+
+
+def scenarios(data: dict, admin: tuple, clerk: tuple):
+    account_ids = data["account_ids"]
+    reversible = iter(data["transaction_ids"])
+    counter = iter(range(10**9))
+    day = data["start"] + timedelta(days=180)
+
+    def new_account(rng):
+        n = next(counter)
+        return "POST", "/accounts", {"json": {"name": "Load", "email": f"load{n}@example.com", "PID": f"LOAD{n:08}"}}
+
+    def transfer(rng):
+        sender_id, recv_id = rng.sample(account_ids, 2)
+        return "POST", "/transactions", {"json": {
+            "type": "transfer", "amount": 1.25, "sender_id": sender_id, "recv_id": recv_id
+        }}
+
+    return [
+        ("login", None, lambda rng: ("POST", "/auth/login", {"data": {"username": clerk[0], "password": clerk[1]}})),
+        ("get_account", clerk, lambda rng: ("GET", f"/accounts/{rng.choice(account_ids)}", {})),
+        ("create_account", admin, new_account),
+        ("update_account", clerk, lambda rng: ("PUT", f"/accounts/{rng.choice(account_ids)}", {"json": {"name": "Load"}})),
+        ("post_transfer", clerk, transfer),
+        ("transactions_by_date", clerk, lambda rng: ("GET", "/transactions/by-date", {"params": {
+            "start": day.isoformat(), "end": (day + timedelta(days=1)).isoformat()
+        }})),
+        ("transactions_by_account", clerk, lambda rng: ("GET", f"/transactions/by-account/{rng.choice(account_ids)}", {})),
+        ("reverse_transaction", admin, lambda rng: ("POST", f"/transactions/{next(reversible)}/reverse", {})),
+    ]
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for name, result in current["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        p99_change = (result["p99_ms"] - before["p99_ms"]) / before["p99_ms"] * 100
+        rps_change = (result["rps"] - before["rps"]) / before["rps"] * 100
+        print(f"{name:<26} p99 {before['p99_ms']:8.1f} -> {result['p99_ms']:8.1f} ms ({p99_change:+.1f}%)"
+              f"   rps {before['rps']:8.1f} -> {result['rps']:8.1f} ({rps_change:+.1f}%)")
+        if p99_change > threshold or -rps_change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--transactions", type=int, default=50_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--only", nargs="*", help="Run only these scenarios")
+    parser.add_argument("--out", default="load-results.json")
+    parser.add_argument("--compare", help="Baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=15.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bankbase-load-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    # Each scenario runs on a single token at full concurrency, so per-employee budgets and
+    # admission shedding are off unless set explicitly in the environment.
+    for name in ("RATE_LIMIT_ACCOUNTS", "RATE_LIMIT_EMPLOYEES", "RATE_LIMIT_EVENTS", "RATE_LIMIT_TRANSACTIONS", "ADMISSION_MAX_IN_FLIGHT"):
+        os.environ.setdefault(name, "0")
+
+    import uvicorn
+    from app.main import app
+    from app.db.database import SessionLocal, engine
+    from app.db.migrations import upgrade
+    from benchmarks.seed import ADMIN, CLERK, seed
+
+    upgrade(engine)
+    with SessionLocal() as db:
+        data = seed(db, args.accounts, args.transactions)
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    base_url = f"http://127.0.0.1:{port}"
+
+    def login(email, password):
+        response = httpx.post(f"{base_url}/auth/login", data={"username": email, "password": password})
+        response.raise_for_status()
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    credentials = {ADMIN: login(*ADMIN), CLERK: login(*CLERK)}
+    results = {}
+    try:
+        for name, who, make_request in scenarios(data, ADMIN, CLERK):
+            if args.only and name not in args.only:
+                continue
+            headers = credentials[who] if who else {}
+            results[name] = asyncio.run(_drive(base_url, headers, make_request, args.concurrency, args.duration))
+            r = results[name]
+            print(f"{name:<26} {r['rps']:8.1f} rps  p50 {r['p50_ms']:8.1f} ms  p99 {r['p99_ms']:8.1f} ms  errors {r['errors']}")
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "accounts": args.accounts,
+            "transactions": args.transactions,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+        },
+        "scenarios": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"Regressed beyond {args.threshold}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import random
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+
+from app.db import ledger
+from tests.factories import AccountFactory, EmployeeFactory, TransactionFactory, hashed_password
+
+ADMIN = ("bench-admin@example.com", "adminpass")
+CLERK = ("bench-clerk@example.com", "clerkpass")
+
+
+def seed(db: Session, accounts: int, transactions: int) -> dict:
+    for factory in (AccountFactory, EmployeeFactory, TransactionFactory):
+        factory._meta.sqlalchemy_session = db
+
+    db.add_all([
+        EmployeeFactory.build(email=ADMIN[0], role="admin", password_hash=hashed_password(ADMIN[1])),
+        EmployeeFactory.build(email=CLERK[0], role="clerk", password_hash=hashed_password(CLERK[1])),
+    ])
+    account_rows = AccountFactory.build_batch(accounts, balance=1_000_000)
+    db.add_all(account_rows)
+    db.flush()
+    account_ids = [account.id for account in account_rows]
+
+    rng = random.Random(1234)
+    start = datetime.now() - timedelta(days=365)
+    step = timedelta(days=365) / max(transactions, 1)
+    rows = []
+    for i in range(transactions):
+        sender_id, recv_id = rng.sample(account_ids, 2)
+        rows.append(TransactionFactory.build(
+            type="transfer", sender_id=sender_id, recv_id=recv_id,
+            amount=rng.randint(1, 50_000) / 100, timestamp=start + step * i,
+        ))
+    db.add_all(rows)
+    db.flush()
+    ledger.rebuild(db)
+    db.commit()
+
+    return {
+        "account_ids": account_ids,
+        "transaction_ids": [tx.id for tx in rows],
+        "start": start,
+    }
@@ -0,0 +1,81 @@
+"""Per-endpoint latency benchmarks against a seeded SQLite database.
+
+    pytest benchmarks --benchmark-json=bench.json
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:15%
+"""
+import random
+from datetime import timedelta
+
+from benchmarks.seed import CLERK
+
+
+def test_login(benchmark, client):
+    def login():
+        return client.post("/auth/login", data={"username": CLERK[0], "password": CLERK[1]})
+
+    assert benchmark(login).status_code == 200
+
+
+def test_create_account(benchmark, client, admin_headers, unique):
+    def create():
+        n = unique()
+        return client.post("/accounts", headers=admin_headers, json={
+            "name": "Bench", "email": f"bench{n}@example.com", "PID": f"BENCH{n:08}"
+        })
+
+    assert benchmark(create).status_code == 200
+
+
+def test_get_account(benchmark, client, clerk_headers, seeded):
+    account_id = seeded["account_ids"][0]
+    assert benchmark(client.get, f"/accounts/{account_id}", headers=clerk_headers).status_code == 200
+
+
+def test_update_account(benchmark, client, clerk_headers, seeded, unique):
+    account_id = seeded["account_ids"][1]
+
+    def update():
+        return client.put(f"/accounts/{account_id}", headers=clerk_headers, json={"name": f"Bench {unique()}"})
+
+    assert benchmark(update).status_code == 200
+
+
+def test_list_accounts(benchmark, client, clerk_headers):
+    assert benchmark(client.get, "/accounts", headers=clerk_headers).status_code == 200
+
+
+def test_post_transfer(benchmark, client, clerk_headers, seeded):
+    rng = random.Random(7)
+
+    def transfer():
+        sender_id, recv_id = rng.sample(seeded["account_ids"], 2)
+        return client.post("/transactions", headers=clerk_headers, json={
+            "type": "transfer", "amount": 1.25, "sender_id": sender_id, "recv_id": recv_id
+        })
+
+    assert benchmark(transfer).status_code == 200
+
+
+def test_transactions_by_date(benchmark, client, clerk_headers, seeded):
+    start = seeded["start"] + timedelta(days=180)
+    params = {"start": start.isoformat(), "end": (start + timedelta(days=1)).isoformat()}
+    assert benchmark(client.get, "/transactions/by-date", params=params, headers=clerk_headers).status_code == 200
+
+
+def test_transactions_by_account(benchmark, client, clerk_headers, seeded):
+    account_id = seeded["account_ids"][2]
+    response = benchmark(client.get, f"/transactions/by-account/{account_id}", headers=clerk_headers)
+    assert response.status_code == 200
+
+
+def test_reverse_transaction(benchmark, client, admin_headers, seeded):
+    pending = iter(seeded["transaction_ids"])
+
+    def setup():
+        return (next(pending),), {}
+
+    def reverse(transaction_id):
+        return client.post(f"/transactions/{transaction_id}/reverse", headers=admin_headers)
+
+    response = benchmark.pedantic(reverse, setup=setup, rounds=50)
+    assert response.status_code in (200, 400)
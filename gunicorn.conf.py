@@ -0,0 +1,24 @@
+# Pre-fork serving: gunicorn -c gunicorn.conf.py app.main:app
+# The app is imported once in the master and workers inherit it copy-on-write.
+import os
+
+from app.core import security
+from app.core.config import settings
+from app.db.database import async_engine, async_read_engine, engine
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+
+def on_starting(server):
+    if settings.PREFORK_WARMUP:
+        security.warm_up()
+
+
+def post_fork(server, worker):
+    # Connections must never be shared across processes; drop any inherited from the master.
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    async_read_engine.sync_engine.dispose(close=False)
@@ -1,31 +1,50 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from app.main import app
-from app.db.database import get_db
+from app.api.auth import get_read_db, user_cache
+from app.core import ratelimit
+from app.db.account_state import account_states
+from app.db.idempotency import response_cache
+from app.db.database import get_db, get_async_db, create_db_engine, create_async_db_engine
 from app.db.models import Base, Employee
-from app.core.security import get_password_hash
-from tests.factories import EmployeeFactory
+from tests.factories import AccountFactory, EmployeeFactory, hashed_password
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 TestingSessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# TestClient runs every request on a fresh event loop, so async connections are not pooled.
+async_engine = create_async_db_engine(SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 @pytest.fixture(scope="session", autouse=True)
 def setup_database():
     Base.metadata.create_all(bind=engine)
     yield
     Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    user_cache.clear()
+    response_cache.clear()
+    account_states.clear()
+    ratelimit.buckets().clear()
+    yield
+    user_cache.clear()
+    response_cache.clear()
+    account_states.clear()
+    ratelimit.buckets().clear()
+
 @pytest.fixture
 def db_session():
     session = TestingSessionLocal()
     EmployeeFactory._meta.sqlalchemy_session = session
+    AccountFactory._meta.sqlalchemy_session = session
     for table in reversed(Base.metadata.sorted_tables):
         session.execute(table.delete())
     session.commit()
@@ -43,7 +62,13 @@ def client(db_session):
         finally:
             pass
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_async_db
     return TestClient(app)
 
 @pytest.fixture
@@ -51,7 +76,7 @@ def admin_user(db_session) -> Employee:
     admin = EmployeeFactory(
         email="admin@example.com",
         role="admin",
-        password_hash=get_password_hash("adminpass"),
+        password_hash=hashed_password("adminpass"),
     )
     db_session.commit()
     return admin
@@ -61,7 +86,7 @@ def clerk_user(db_session) -> Employee:
     clerk = EmployeeFactory(
         email="clerk@example.com",
         role="clerk",
-        password_hash=get_password_hash("clerkpass"),
+        password_hash=hashed_password("clerkpass"),
     )
     db_session.commit()
     return clerk
@@ -91,19 +116,17 @@ def non_admin_client(client, get_auth_token, clerk_user):
     return client
 
 @pytest.fixture
-def test_account(db_session):
-    from tests.factories import AccountFactory
-    AccountFactory._meta.sqlalchemy_session = db_session
-    return AccountFactory()
+def account_factory(db_session):
+    return AccountFactory
+
+@pytest.fixture
+def test_account(account_factory):
+    return account_factory()
 
 @pytest.fixture
-def sender_account(db_session):
-    from tests.factories import AccountFactory
-    AccountFactory._meta.sqlalchemy_session = db_session
-    return AccountFactory()
+def sender_account(account_factory):
+    return account_factory()
 
 @pytest.fixture
-def receiver_account(db_session):
-    from tests.factories import AccountFactory
-    AccountFactory._meta.sqlalchemy_session = db_session
-    return AccountFactory()
+def receiver_account(account_factory):
+    return account_factory()
@@ -1,8 +1,14 @@
 import factory
+from functools import lru_cache
 from factory.alchemy import SQLAlchemyModelFactory
 from app.db.models import Employee, Transaction, Account
 from app.core.security import get_password_hash
 
+# bcrypt is deliberately slow; hash each distinct fixture password once per run.
+@lru_cache(maxsize=None)
+def hashed_password(password: str) -> str:
+    return get_password_hash(password)
+
 class EmployeeFactory(SQLAlchemyModelFactory):
     class Meta:
         model = Employee
@@ -13,7 +19,7 @@ class EmployeeFactory(SQLAlchemyModelFactory):
     email = factory.Sequence(lambda n: f"employee{n}@test.com")
     phone = factory.Faker("phone_number")
     role = "clerk"
-    password_hash = factory.LazyFunction(lambda: get_password_hash("password123"))
+    password_hash = factory.LazyFunction(lambda: hashed_password("password123"))
 
 
 class AccountFactory(SQLAlchemyModelFactory):
@@ -1,3 +1,13 @@
+import csv
+import io
+from datetime import UTC, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, select, update
+
+from app.db import ledger, models, outbox, posting, snapshots, statements
+
 def test_create_account_success(admin_client):
     payload = {
         "name": "Test User",
@@ -38,6 +48,35 @@ def test_update_account(non_admin_client, test_account):
     assert res.status_code == 200
     assert res.json()["name"] == "Updated Name"
 
+def test_update_account_conflicts_with_a_concurrent_edit(non_admin_client, db_session, test_account, monkeypatch):
+    record = outbox.record
+    name = test_account.name
+
+    # Another edit commits between our read and our commit.
+    def record_after_concurrent_edit(db, *args):
+        db_session.execute(
+            update(models.Account).where(models.Account.id == test_account.id)
+            .values(phone="555-0100", version=models.Account.version + 1)
+        )
+        db_session.commit()
+        record(db, *args)
+
+    monkeypatch.setattr(outbox, "record", record_after_concurrent_edit)
+    res = non_admin_client.put(f"/accounts/{test_account.id}", json={"name": "Updated Name"})
+    assert res.status_code == 409
+    db_session.refresh(test_account)
+    assert (test_account.name, test_account.phone) == (name, "555-0100")
+
+def test_update_account_cannot_set_balance(non_admin_client, test_account):
+    res = non_admin_client.put(f"/accounts/{test_account.id}", json={"balance": 5.0})
+    assert res.status_code == 422
+
+def test_posting_leaves_account_version_alone(non_admin_client, db_session, test_account):
+    version = test_account.version
+    non_admin_client.post("/transactions", json={"type": "deposit", "amount": 10.0, "recv_id": test_account.id})
+    db_session.refresh(test_account)
+    assert test_account.version == version
+
 def test_get_account_by_id(non_admin_client, test_account):
     res = non_admin_client.get(f"/accounts/{test_account.id}")
     assert res.status_code == 200
@@ -65,3 +104,224 @@ def test_delete_account(admin_client, test_account):
 def test_delete_account_not_found(admin_client):
     res = admin_client.delete("/accounts/99999")
     assert res.status_code == 404
+
+def test_account_summary_tracks_postings(admin_client, sender_account, receiver_account):
+    admin_client.post("/transactions", json={
+        "type": "transfer", "amount": 200.0,
+        "sender_id": sender_account.id, "recv_id": receiver_account.id
+    })
+    tx_id = admin_client.post("/transactions", json={
+        "type": "deposit", "amount": 50.0, "recv_id": sender_account.id
+    }).json()["id"]
+    admin_client.post(f"/transactions/{tx_id}/reverse")
+
+    res = admin_client.get(f"/accounts/{sender_account.id}/summary")
+    assert res.status_code == 200
+    data = res.json()
+    assert data["total_in"] == 50.0
+    assert data["total_out"] == 250.0
+    assert data["count_in"] == 1
+    assert data["count_out"] == 2
+    assert data["last_activity"] is not None
+
+def test_account_summary_without_activity(non_admin_client, test_account):
+    res = non_admin_client.get(f"/accounts/{test_account.id}/summary")
+    assert res.status_code == 200
+    assert res.json()["count_in"] == 0
+
+def test_account_summary_not_found(non_admin_client):
+    res = non_admin_client.get("/accounts/99999/summary")
+    assert res.status_code == 404
+
+def test_ledger_rebuild_verifies_balances(admin_client, db_session, sender_account, receiver_account):
+    admin_client.post("/transactions", json={
+        "type": "transfer", "amount": 200.0,
+        "sender_id": sender_account.id, "recv_id": receiver_account.id
+    })
+    assert ledger.rebuild(db_session) == []
+    db_session.commit()
+
+    db_session.execute(update(models.Account).where(models.Account.id == sender_account.id).values(balance=5))
+    db_session.execute(delete(models.AccountLedgerSummary).where(
+        models.AccountLedgerSummary.account_id == receiver_account.id
+    ))
+    problems = ledger.rebuild(db_session)
+    db_session.commit()
+
+    assert problems == [{
+        "account_id": sender_account.id, "issue": "balance_mismatch", "expected": 800.0, "actual": 5.0
+    }]
+    summary = db_session.get(models.AccountLedgerSummary, receiver_account.id)
+    assert summary.total_in == 200.0
+    assert summary.opening_balance == 1000.0
+
+def test_get_all_accounts_matches_schema_serialization(non_admin_client, test_account):
+    non_admin_client.post("/transactions", json={
+        "type": "deposit", "amount": 10.1, "recv_id": test_account.id
+    })
+    listed = non_admin_client.get("/accounts").json()
+    single = non_admin_client.get(f"/accounts/{test_account.id}").json()
+    assert listed == [single]
+    assert single["balance"] == 1010.1
+
+def _post_at(db_session, timestamp, **payload):
+    tx = posting.post_transaction(
+        db_session, payload.get("sender_id"), payload.get("recv_id"), Decimal(payload["amount"]),
+        models.TransactionType(payload["type"])
+    )
+    tx.timestamp = timestamp
+    db_session.commit()
+
+def test_account_statement_csv_has_running_balance(non_admin_client, db_session, sender_account, receiver_account):
+    _post_at(db_session, datetime(2024, 1, 10), type="deposit", amount="200", recv_id=sender_account.id)
+    _post_at(db_session, datetime(2024, 2, 5), type="transfer", amount="300.50",
+             sender_id=sender_account.id, recv_id=receiver_account.id)
+    _post_at(db_session, datetime(2024, 2, 20), type="deposit", amount="25", recv_id=sender_account.id)
+    _post_at(db_session, datetime(2024, 3, 1), type="withdrawal", amount="10", sender_id=sender_account.id)
+
+    res = non_admin_client.get(f"/accounts/{sender_account.id}/statement", params={
+        "start": "2024-02-01T00:00:00", "end": "2024-02-29T23:59:59",
+    })
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/csv")
+    assert res.headers["X-Opening-Balance"] == "1200.00"
+    rows = list(csv.reader(io.StringIO(res.text)))
+    assert rows[0] == ["id", "timestamp", "type", "sender_id", "recv_id", "amount", "balance"]
+    assert [(row[2], row[5], row[6]) for row in rows[1:]] == [
+        ("transfer", "-300.50", "899.50"),
+        ("deposit", "25.00", "924.50"),
+    ]
+
+def test_account_statement_reads_one_snapshot(non_admin_client, db_session, sender_account, monkeypatch):
+    net_cents_between = statements.net_cents_between
+
+    # A deposit commits after the statement has read the live balance.
+    def net_after_concurrent_deposit(*args):
+        posting.post_transaction(db_session, None, sender_account.id, Decimal("50"), models.TransactionType.deposit)
+        db_session.commit()
+        return net_cents_between(*args)
+
+    monkeypatch.setattr(statements, "net_cents_between", net_after_concurrent_deposit)
+    res = non_admin_client.get(f"/accounts/{sender_account.id}/statement", params={
+        "start": "2024-01-01T00:00:00", "end": "2100-01-01T00:00:00",
+    })
+    assert res.headers["X-Opening-Balance"] == "1000.00"
+    assert list(csv.reader(io.StringIO(res.text)))[1:] == []
+
+def test_account_statement_parquet(non_admin_client, db_session, sender_account):
+    pq = pytest.importorskip("pyarrow.parquet")
+    _post_at(db_session, datetime(2024, 1, 10), type="deposit", amount="200", recv_id=sender_account.id)
+
+    res = non_admin_client.get(f"/accounts/{sender_account.id}/statement", params={
+        "start": "2024-01-01T00:00:00", "end": "2024-12-31T00:00:00", "format": "parquet",
+    })
+    assert res.status_code == 200
+    table = pq.read_table(io.BytesIO(res.content))
+    assert table.column("balance").to_pylist() == [Decimal("1200.00")]
+
+def test_account_statement_validates_range(non_admin_client, test_account):
+    res = non_admin_client.get(f"/accounts/{test_account.id}/statement", params={
+        "start": "2024-02-01T00:00:00", "end": "2024-01-01T00:00:00",
+    })
+    assert res.status_code == 400
+    res = non_admin_client.get("/accounts/99999/statement", params={
+        "start": "2024-01-01T00:00:00", "end": "2024-02-01T00:00:00",
+    })
+    assert res.status_code == 404
+
+def test_get_all_accounts_filters_sorts_and_projects(non_admin_client, account_factory):
+    low = account_factory(balance=50.0)
+    high = account_factory(balance=5000.0)
+    account_factory(balance=700.0, is_active=False)
+
+    res = non_admin_client.get("/accounts", params={
+        "is_active": "true", "min_balance": "10", "sort": "-balance", "fields": "id,balance",
+    })
+    assert res.status_code == 200
+    assert res.json() == [{"id": high.id, "balance": 5000.0}, {"id": low.id, "balance": 50.0}]
+
+    res = non_admin_client.get("/accounts", params={"max_balance": "100", "fields": "name"})
+    assert res.json() == [{"name": low.name}]
+
+def test_get_all_accounts_rejects_unknown_fields(non_admin_client):
+    res = non_admin_client.get("/accounts", params={"fields": "id,password"})
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Unknown fields: password"
+
+def test_balance_snapshots_answer_point_in_time_queries(non_admin_client, db_session, sender_account, receiver_account):
+    yesterday = datetime.now(UTC).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    day_one, day_two = yesterday - timedelta(days=2), yesterday - timedelta(days=1)
+    for account in (sender_account, receiver_account):
+        account.created_on = yesterday - timedelta(days=10)
+    _post_at(db_session, day_one.replace(hour=10), type="deposit", amount="100", recv_id=sender_account.id)
+    _post_at(db_session, day_two.replace(hour=12), type="transfer", amount="30",
+             sender_id=sender_account.id, recv_id=receiver_account.id)
+    _post_at(db_session, yesterday.replace(hour=9), type="withdrawal", amount="20", sender_id=sender_account.id)
+
+    def balance(as_of):
+        res = non_admin_client.get(f"/accounts/{sender_account.id}/balance", params={"as_of": as_of.isoformat()})
+        assert res.status_code == 200
+        return res.json()
+
+    # Without snapshots the balance is rolled back from the live one.
+    assert balance(day_two.replace(hour=13)) == {
+        "account_id": sender_account.id, "as_of": day_two.replace(hour=13).isoformat(),
+        "balance": 1070.0, "snapshot_day": None,
+    }
+
+    assert snapshots.snapshot_days(db_session, since=day_one.date()) == [yesterday.date(), day_two.date(), day_one.date()]
+    db_session.commit()
+    assert snapshots.snapshot_days(db_session, since=day_one.date()) == []
+    rows = db_session.scalars(
+        select(models.AccountDailyBalance).where(models.AccountDailyBalance.account_id == sender_account.id)
+        .order_by(models.AccountDailyBalance.day)
+    ).all()
+    assert [(row.closing_balance, row.in_total, row.out_total) for row in rows] == [
+        (Decimal("1100.00"), Decimal("100.00"), Decimal("0.00")),
+        (Decimal("1070.00"), Decimal("0.00"), Decimal("30.00")),
+        (Decimal("1050.00"), Decimal("0.00"), Decimal("20.00")),
+    ]
+
+    # The nearest snapshot wins, plus the transactions between it and as_of.
+    for as_of, expected, snapshot_day in (
+        (day_two.replace(hour=11), 1100.0, day_one),
+        (day_two.replace(hour=13), 1070.0, day_two),
+        (yesterday.replace(hour=10), 1050.0, day_two),
+    ):
+        result = balance(as_of)
+        assert (result["balance"], result["snapshot_day"]) == (expected, snapshot_day.date().isoformat())
+    assert balance(yesterday - timedelta(days=20))["balance"] == 0
+
+    res = non_admin_client.get("/accounts/daily-totals", params={"day": day_two.date().isoformat()})
+    assert res.status_code == 200
+    assert res.json() == {
+        "day": day_two.date().isoformat(), "accounts": 2,
+        "closing_balance": 2100.0, "in_total": 30.0, "out_total": 30.0,
+        "deposit_total": 0.0, "withdrawal_total": 0.0, "transfer_total": 30.0, "reversal_total": 0.0,
+    }
+
+def test_daily_totals_split_flows_by_transaction_type(non_admin_client, db_session, sender_account, receiver_account):
+    day = datetime.now(UTC).replace(tzinfo=None, hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+    for account in (sender_account, receiver_account):
+        account.created_on = day - timedelta(days=10)
+    _post_at(db_session, day.replace(hour=9), type="deposit", amount="100", recv_id=sender_account.id)
+    _post_at(db_session, day.replace(hour=10), type="transfer", amount="30",
+             sender_id=sender_account.id, recv_id=receiver_account.id)
+    _post_at(db_session, day.replace(hour=11), type="withdrawal", amount="20", sender_id=receiver_account.id)
+    snapshots.snapshot_days(db_session, since=day.date())
+    db_session.commit()
+
+    res = non_admin_client.get("/accounts/daily-totals", params={"day": day.date().isoformat()})
+    assert res.status_code == 200
+    # The transfer is in both leg totals but moves no money in or out of the bank.
+    assert res.json() == {
+        "day": day.date().isoformat(), "accounts": 2,
+        "closing_balance": 2080.0, "in_total": 130.0, "out_total": 50.0,
+        "deposit_total": 100.0, "withdrawal_total": 20.0, "transfer_total": 30.0, "reversal_total": 0.0,
+    }
+
+def test_balance_endpoints_not_found(non_admin_client):
+    assert non_admin_client.get("/accounts/99999/balance", params={"as_of": "2024-01-01T00:00:00"}).status_code == 404
+    res = non_admin_client.get("/accounts/daily-totals", params={"day": "2024-01-01"})
+    assert res.status_code == 404
+    assert res.json()["detail"] == "No balance snapshot for 2024-01-01"
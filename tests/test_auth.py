@@ -1,3 +1,15 @@
+import subprocess
+import sys
+import time
+from datetime import timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core import security, tokens
+from app.core.config import settings
+
 def test_login_success(client, admin_user):
     response = client.post("/auth/login", data={"username": admin_user.email, "password": "adminpass"})
     assert response.status_code == 200
@@ -40,3 +52,117 @@ def test_change_password_wrong_current(client, admin_user):
     )
     assert response.status_code == 400
     assert response.json()["detail"] == "Current password is incorrect"
+
+def test_current_user_is_cached(client, clerk_user):
+    token = client.post("/auth/login", data={"username": clerk_user.email, "password": "clerkpass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/accounts", headers=headers).status_code == 200
+
+    statements = []
+    listen = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(Engine, "before_cursor_execute", listen)
+    try:
+        assert client.get("/accounts", headers=headers).status_code == 200
+    finally:
+        event.remove(Engine, "before_cursor_execute", listen)
+    assert statements
+    assert not any("employees" in statement for statement in statements)
+
+def test_role_change_invalidates_cached_user(client, admin_user, clerk_user):
+    admin_token = client.post("/auth/login", data={"username": admin_user.email, "password": "adminpass"}).json()["access_token"]
+    clerk_token = client.post("/auth/login", data={"username": clerk_user.email, "password": "clerkpass"}).json()["access_token"]
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    clerk_headers = {"Authorization": f"Bearer {clerk_token}"}
+
+    assert client.delete("/accounts/99999", headers=clerk_headers).status_code == 403
+
+    client.patch(f"/employees/{clerk_user.id}", json={"role": "admin"}, headers=admin_headers)
+    assert client.delete("/accounts/99999", headers=clerk_headers).status_code == 404
+
+def test_deleted_employee_token_rejected(client, admin_user, clerk_user):
+    admin_token = client.post("/auth/login", data={"username": admin_user.email, "password": "adminpass"}).json()["access_token"]
+    clerk_token = client.post("/auth/login", data={"username": clerk_user.email, "password": "clerkpass"}).json()["access_token"]
+    clerk_headers = {"Authorization": f"Bearer {clerk_token}"}
+    assert client.get("/accounts", headers=clerk_headers).status_code == 200
+
+    client.delete(f"/employees/{clerk_user.id}", headers={"Authorization": f"Bearer {admin_token}"})
+    res = client.get("/accounts", headers=clerk_headers)
+    assert res.status_code == 404
+    assert res.json()["detail"] == "User not found"
+
+def test_login_sheds_load_when_hashing_queue_is_full(client, admin_user, monkeypatch):
+    monkeypatch.setattr(settings, "BCRYPT_MAX_PENDING", 0)
+    response = client.post("/auth/login", data={"username": admin_user.email, "password": "adminpass"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_metrics_report_hashing_queue_depth(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "bankbase_bcrypt_queue_depth 0" in response.text
+
+def test_importing_the_app_defers_crypto_stacks():
+    code = "import sys, app.main; print(sorted({'jose', 'passlib'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+def test_tokens_issued_by_jose_verify_through_the_fast_path(monkeypatch):
+    from jose import jwt
+
+    token = jwt.encode({"id": 7, "role": "clerk", "exp": int(time.time()) + 60}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    assert security.decode_access_token(token)["id"] == 7
+
+    # A repeat caller is served from the verified-token cache without touching the key.
+    monkeypatch.setattr(tokens, "verifier", lambda kid: pytest.fail("token was verified again"))
+    assert security.decode_access_token(token)["role"] == "clerk"
+
+def test_forged_expired_and_unsigned_tokens_are_rejected():
+    token = security.create_access_token({"id": 1, "role": "admin"})
+    header, claims, signature = token.split(".")
+    forged_claims = tokens._b64encode(b'{"id":2,"role":"admin","exp":9999999999}').decode()
+    unsigned_header = tokens._b64encode(b'{"alg":"none","typ":"JWT"}').decode()
+    expired = security.create_access_token({"id": 1, "role": "admin"}, expires_delta=timedelta(seconds=-1))
+
+    for bad in (f"{header}.{forged_claims}.{signature}", f"{unsigned_header}.{claims}.", expired, "not-a-token"):
+        with pytest.raises(security.InvalidToken):
+            security.decode_access_token(bad)
+
+@pytest.fixture
+def rsa_keys(tmp_path, monkeypatch):
+    import rsa
+
+    def write_key(kid):
+        public, private = rsa.newkeys(1024)
+        (tmp_path / f"{kid}.pem").write_bytes(public.save_pkcs1())
+        (tmp_path / f"{kid}.key").write_bytes(private.save_pkcs1())
+
+    write_key("2026-01")
+    write_key("2026-02")
+    monkeypatch.setattr(settings, "ALGORITHM", "RS256")
+    monkeypatch.setattr(settings, "JWT_PUBLIC_KEYS_DIR", str(tmp_path))
+
+    def use(kid):
+        monkeypatch.setattr(settings, "JWT_KEY_ID", kid)
+        monkeypatch.setattr(settings, "JWT_PRIVATE_KEY_FILE", str(tmp_path / f"{kid}.key"))
+        tokens.signing_key.cache_clear()
+
+    tokens.reload_keys()
+    yield use
+    tokens.reload_keys()
+
+def test_rs256_keys_rotate_by_kid(rsa_keys, tmp_path):
+    rsa_keys("2026-01")
+    old_token = security.create_access_token({"id": 3, "role": "clerk"})
+    rsa_keys("2026-02")
+    new_token = security.create_access_token({"id": 4, "role": "clerk"})
+    tokens.verified_tokens.clear()
+
+    assert security.decode_access_token(old_token)["id"] == 3
+    assert security.decode_access_token(new_token)["id"] == 4
+
+    # Retiring a key means removing its public half; tokens it signed stop verifying.
+    (tmp_path / "2026-01.pem").unlink()
+    tokens.reload_keys()
+    with pytest.raises(security.InvalidToken):
+        security.decode_access_token(old_token)
+    assert security.decode_access_token(new_token)["id"] == 4
@@ -0,0 +1,74 @@
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.api.auth import LAST_WRITE_COOKIE, ReadAfterWriteMiddleware, _last_write
+from app.core.config import settings
+from app.db import database
+from app.db.database import async_database_url, create_async_db_engine, create_db_engine
+
+
+def test_sqlite_connections_use_wal_and_busy_timeout(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'bank.db'}")
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == settings.SQLITE_BUSY_TIMEOUT_MS
+    assert engine.pool.size() == settings.DB_POOL_SIZE
+
+
+def test_in_memory_sqlite_keeps_default_pool():
+    engine = create_db_engine("sqlite://", poolclass=StaticPool)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT 1").scalar() == 1
+
+
+def test_async_database_url_maps_drivers():
+    assert async_database_url("sqlite:///./bank.db") == "sqlite+aiosqlite:///./bank.db"
+    assert async_database_url("postgresql://u:p@db/bank") == "postgresql+asyncpg://u:p@db/bank"
+
+
+def test_read_session_sticks_to_primary_after_a_recent_write(tmp_path, monkeypatch):
+    primary = create_async_db_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_db_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    monkeypatch.setattr(database, "async_engine", primary)
+    monkeypatch.setattr(database, "async_read_engine", replica)
+    monkeypatch.setattr(database, "AsyncSessionLocal", async_sessionmaker(primary))
+    monkeypatch.setattr(database, "AsyncReadSessionLocal", async_sessionmaker(replica, info={"replica": True}))
+
+    assert database.read_session().bind is replica
+    assert database.read_session(time.time()).bind is primary
+    assert database.read_session(time.time() - settings.READ_AFTER_WRITE_SECONDS - 1).bind is replica
+    # A time in the future must not pin the client to the primary.
+    assert database.read_session(time.time() + 3600).bind is replica
+
+
+def test_committing_requests_hand_the_write_time_to_the_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "async_read_engine", create_async_db_engine(f"sqlite:///{tmp_path / 'replica.db'}"))
+    SessionLocal = sessionmaker(bind=create_db_engine(f"sqlite:///{tmp_path / 'primary.db'}"))
+    ReplicaSessionLocal = sessionmaker(bind=create_db_engine(f"sqlite:///{tmp_path / 'replica.db'}"), info={"replica": True})
+
+    def endpoint(request: Request):
+        with (ReplicaSessionLocal if request.query_params.get("replica") else SessionLocal)() as db:
+            if request.query_params.get("commit"):
+                db.commit()
+        return PlainTextResponse(str(_last_write(request)))
+
+    client = TestClient(ReadAfterWriteMiddleware(Starlette(routes=[Route("/", endpoint, methods=["GET", "POST"])])))
+    assert LAST_WRITE_COOKIE not in client.get("/").cookies
+    assert LAST_WRITE_COOKIE not in client.get("/", params={"commit": 1, "replica": 1}).cookies
+
+    before = time.time()
+    assert LAST_WRITE_COOKIE in client.post("/", params={"commit": 1}).cookies
+    # The client sends it back, and get_read_db routes on it.
+    assert before <= float(client.get("/").text) <= time.time()
+    # A forged or unsigned stamp is ignored.
+    client.cookies.set(LAST_WRITE_COOKIE, f"{time.time() + 3600:.3f}")
+    assert client.get("/").text == "None"
@@ -82,6 +82,16 @@ def test_list_employees(admin_client, db_session):
     assert len(res.json()) >= 3
 
 
+def test_list_employees_filters_by_role_with_projection(admin_client, db_session):
+    EmployeeFactory.create_batch(2, role="clerk")
+    db_session.commit()
+
+    res = admin_client.get("/employees", params={"role": "clerk", "sort": "-joined_on", "fields": "email,role"})
+    assert res.status_code == 200
+    assert len(res.json()) == 2
+    assert all(set(row) == {"email", "role"} and row["role"] == "clerk" for row in res.json())
+
+
 def test_list_employees_requires_auth(client):
     res = client.get("/employees")
     assert res.status_code == 401
@@ -113,3 +123,9 @@ def test_get_nonexistent_employee(admin_client):
     res = admin_client.get("/employees/9999")
     assert res.status_code == 404
     assert res.json()["detail"] == "Employee not found"
+
+
+def test_list_employees_matches_schema_serialization(admin_client, admin_user):
+    listed = admin_client.get("/employees").json()
+    single = admin_client.get(f"/employees/{admin_user.id}").json()
+    assert listed == [single]
@@ -0,0 +1,63 @@
+import asyncio
+
+from app.api.events import _stream_events
+from tests.conftest import TestingAsyncSessionLocal
+
+
+def test_postings_and_account_changes_are_published(admin_client, sender_account, receiver_account):
+    admin_client.post("/transactions", json={
+        "type": "transfer", "amount": 25.0, "sender_id": sender_account.id, "recv_id": receiver_account.id
+    })
+    admin_client.post("/transactions", json={
+        "type": "transfer", "amount": 5000.0, "sender_id": sender_account.id, "recv_id": receiver_account.id
+    })
+    admin_client.patch(f"/accounts/{receiver_account.id}/toggle-active")
+
+    res = admin_client.get("/events", params={"after": 0})
+    assert res.status_code == 200
+    data = res.json()
+    assert [event["type"] for event in data["events"]] == ["transaction.posted", "account.updated"]
+    assert data["events"][0]["payload"]["amount"] == "25.00"
+    assert data["events"][1]["payload"]["is_active"] is False
+    assert data["events"][1]["payload"]["balance"] == "1025.00"
+    assert data["next_offset"] == data["events"][-1]["id"]
+
+    topic = admin_client.get("/events", params={"after": 0, "topic": "account"}).json()
+    assert [event["entity_id"] for event in topic["events"]] == [receiver_account.id]
+
+    empty = admin_client.get("/events", params={"after": data["next_offset"], "wait": 0.2}).json()
+    assert empty == {"events": [], "next_offset": data["next_offset"]}
+
+
+def test_reversals_publish_both_sides(admin_client, sender_account, receiver_account):
+    tx_id = admin_client.post("/transactions", json={
+        "type": "transfer", "amount": 10.0, "sender_id": sender_account.id, "recv_id": receiver_account.id
+    }).json()["id"]
+    reversal_id = admin_client.post(f"/transactions/{tx_id}/reverse").json()["reversal"]["id"]
+
+    events = admin_client.get("/events").json()["events"]
+    assert [(event["type"], event["entity_id"]) for event in events] == [
+        ("transaction.posted", tx_id), ("transaction.posted", reversal_id), ("transaction.reversed", tx_id),
+    ]
+
+
+class _OneShotRequest:
+    def __init__(self):
+        self.polls = 0
+
+    async def is_disconnected(self):
+        self.polls += 1
+        return self.polls > 1
+
+
+def test_event_stream_formats_server_sent_events(admin_client, sender_account):
+    admin_client.post("/transactions", json={"type": "deposit", "amount": 1.0, "recv_id": sender_account.id})
+
+    async def collect():
+        async with TestingAsyncSessionLocal() as db:
+            return [frame async for frame in _stream_events(_OneShotRequest(), db, 0, 10, None)]
+
+    frames = asyncio.run(collect())
+    assert len(frames) == 1
+    assert frames[0].startswith(b"id: ")
+    assert b"event: transaction.posted\ndata: {" in frames[0]
@@ -0,0 +1,122 @@
+import asyncio
+import cProfile
+import pstats
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.core import instrumentation
+from app.core.config import settings
+from app.core.metrics import Histogram
+
+
+@pytest.fixture
+def metrics_client(admin_client):
+    instrumentation.install_sql_listeners()
+    client = TestClient(instrumentation.MetricsMiddleware(app))
+    client.headers = admin_client.headers
+    return client
+
+
+def _series(histogram: Histogram, *labels: str):
+    return histogram._series.get(labels)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("demo_seconds", "Demo", ("route",), (0.1, 1.0))
+    histogram.observe(0.05, "/a")
+    histogram.observe(0.5, "/a")
+    histogram.observe(5, "/a")
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{route="/a"} 3' in lines
+
+
+def test_request_metrics_are_labelled_by_route(metrics_client, test_account):
+    before = _series(instrumentation.request_statements, "GET", "/accounts/{account_id}", "200")
+    before_count = before[1] if before else 0
+
+    res = metrics_client.get(f"/accounts/{test_account.id}")
+    assert res.status_code == 200
+
+    series = _series(instrumentation.request_statements, "GET", "/accounts/{account_id}", "200")
+    assert series[1] == before_count + 1
+    assert series[2] >= 1
+
+    body = metrics_client.get("/metrics").text
+    assert 'bankbase_request_duration_seconds_count{method="GET",route="/accounts/{account_id}",status="200"}' in body
+
+
+def test_list_endpoints_count_serialized_rows(metrics_client, test_account):
+    before = _series(instrumentation.request_rows, "GET", "/accounts", "200")
+    before_rows = before[2] if before else 0
+
+    assert metrics_client.get("/accounts").status_code == 200
+    assert _series(instrumentation.request_rows, "GET", "/accounts", "200")[2] == before_rows + 1
+
+
+def test_slow_sampled_request_dumps_profile(metrics_client, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "PROFILE_SLOW_MS", 0)
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+
+    res = metrics_client.get("/accounts")
+    assert res.status_code == 200
+    assert [p.suffix for p in tmp_path.iterdir()] == [".prof"]
+
+
+def test_only_one_request_is_profiled_at_a_time(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "PROFILE_SLOW_MS", 0)
+    monkeypatch.setattr(settings, "PROFILE_DIR", str(tmp_path))
+
+    async def scenario():
+        release = asyncio.Event()
+        sampled = []
+
+        async def slow_app(scope, receive, send):
+            sampled.append(instrumentation.current_stats().profiler is not None)
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def send(message):
+            pass
+
+        middleware = instrumentation.MetricsMiddleware(slow_app)
+        scope = {"type": "http", "method": "GET", "path": "/accounts"}
+        requests = [asyncio.create_task(middleware(dict(scope), None, send)) for _ in range(2)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(*requests)
+        return sampled
+
+    assert asyncio.run(scenario()) == [True, False]
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_async_profile_leaves_out_other_coroutines():
+    def work_elsewhere():
+        pass
+
+    async def other_request():
+        work_elsewhere()
+
+    async def endpoint():
+        await asyncio.sleep(0)
+        return "done"
+
+    async def scenario(profiler):
+        other = asyncio.create_task(other_request())
+        result = await instrumentation._ProfiledCoroutine(endpoint(), profiler)
+        await other
+        return result
+
+    profiler = cProfile.Profile()
+    assert asyncio.run(scenario(profiler)) == "done"
+    profiled = {name for _, _, name in pstats.Stats(profiler).stats}
+    assert "endpoint" in profiled
+    assert "work_elsewhere" not in profiled
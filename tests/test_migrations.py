@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+from sqlalchemy import create_engine, func, inspect, select
+from sqlalchemy.orm import Session
+
+from app.db import ledger, models
+from app.db.migrations import MIGRATIONS, upgrade
+
+NEW_INDEXES = {
+    "ix_transactions_sender_id_timestamp",
+    "ix_transactions_recv_id_timestamp",
+    "ix_transactions_timestamp",
+}
+
+
+def _index_names(engine):
+    return {index["name"] for index in inspect(engine).get_indexes("transactions")}
+
+
+def test_upgrade_existing_database_adds_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bank.db'}")
+    models.Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for name in NEW_INDEXES:
+            conn.exec_driver_sql(f"DROP INDEX {name}")
+
+    applied = upgrade(engine)
+
+    assert "add_transaction_indexes" in applied
+    assert NEW_INDEXES <= _index_names(engine)
+    assert upgrade(engine) == []
+
+
+def test_upgrade_fresh_database_creates_schema(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bank.db'}")
+
+    applied = upgrade(engine)
+
+    assert applied == [name for _, name, _ in MIGRATIONS]
+    assert NEW_INDEXES <= _index_names(engine)
+
+
+def test_upgrade_converts_float_money_to_minor_units(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bank.db'}")
+    models.Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO accounts (id, PID, name, email, balance, created_on, is_active) VALUES "
+            "(1, 'P1', 'A', 'a@x.com', 1000.25, '2024-01-01', 1), (2, 'P2', 'B', 'b@x.com', 0.35, '2024-01-01', 1)"
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO transactions (sender_id, recv_id, amount, timestamp, reversed, type) "
+            "VALUES (1, 2, 0.35, '2024-01-02', 0, 'transfer')"
+        )
+
+    upgrade(engine)
+
+    with Session(engine) as db:
+        assert db.get(models.Account, 1).balance == Decimal("1000.25")
+        assert db.scalars(select(models.Transaction.amount)).one() == Decimal("0.35")
+        summary = db.get(models.AccountLedgerSummary, 2)
+        assert summary.total_in == Decimal("0.35")
+        assert summary.opening_balance == Decimal("0.00")
+        assert db.scalar(select(func.sum(models.Account.balance))) == Decimal("1000.60")
+        assert ledger.rebuild(db) == []
@@ -0,0 +1,99 @@
+import json
+import os
+from datetime import datetime, UTC
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.core.config import settings
+from app.db import ledger, models, partitions, posting
+
+
+def test_month_helpers():
+    assert partitions.add_months(datetime(2024, 11, 1), 3) == datetime(2025, 2, 1)
+    assert partitions.add_months(datetime(2024, 1, 1), -1) == datetime(2023, 12, 1)
+    assert list(partitions.months_between(datetime(2024, 11, 20), datetime(2025, 1, 3))) == [
+        datetime(2024, 11, 1), datetime(2024, 12, 1), datetime(2025, 1, 1),
+    ]
+
+
+@pytest.fixture
+def archived_month(db_session, sender_account, receiver_account, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    old = []
+    for amount in (Decimal("100"), Decimal("50")):
+        old.append(posting.post_transaction(
+            db_session, sender_account.id, receiver_account.id, amount, models.TransactionType.transfer
+        ).id)
+    posting.post_transaction(db_session, None, sender_account.id, Decimal("10"), models.TransactionType.deposit)
+    db_session.execute(
+        update(models.Transaction).where(models.Transaction.id.in_(old)).values(timestamp=datetime(2024, 3, 15))
+    )
+    db_session.commit()
+
+    archive = partitions.archive_period(db_session, datetime(2024, 3, 1))
+    db_session.commit()
+    return archive
+
+
+def test_archive_period_moves_closed_month_out_of_hot_table(db_session, archived_month, sender_account):
+    assert archived_month.row_count == 2
+    assert os.path.exists(archived_month.path)
+    assert db_session.scalar(select(func.count()).select_from(models.Transaction)) == 1
+
+    # Summaries keep lifetime totals, and the rebuild counts the archive back in.
+    summary = db_session.get(models.AccountLedgerSummary, sender_account.id)
+    assert (summary.opening_balance, summary.total_out, summary.count_out) == (Decimal("1000"), Decimal("150"), 2)
+    assert ledger.rebuild(db_session) == []
+    db_session.refresh(summary)
+    assert (summary.total_in, summary.total_out, summary.count_in, summary.count_out) == (Decimal("10"), Decimal("150"), 1, 2)
+
+    with pytest.raises(ValueError):
+        partitions.archive_period(db_session, datetime(2024, 3, 1))
+    with pytest.raises(ValueError):
+        partitions.archive_period(db_session, datetime.now(UTC))
+
+
+def test_queries_read_archived_periods(admin_client, archived_month, sender_account):
+    res = admin_client.get("/transactions/by-date", params={"start": "2024-03-01T00:00:00", "end": "2024-03-31T23:59:59"})
+    assert res.status_code == 200
+    assert [tx["amount"] for tx in res.json()] == [100.0, 50.0]
+
+    res = admin_client.get("/transactions/by-date", params={"start": "2024-01-01T00:00:00", "end": "2100-01-01T00:00:00"})
+    assert len(res.json()) == 3
+
+    res = admin_client.get(f"/transactions/by-account/{sender_account.id}")
+    assert [tx["type"] for tx in res.json()] == ["transfer", "transfer", "deposit"]
+
+    res = admin_client.get(f"/accounts/{sender_account.id}/statement", params={
+        "start": "2024-03-01T00:00:00", "end": "2100-01-01T00:00:00",
+    })
+    assert res.headers["X-Opening-Balance"] == "1000.00"
+    assert [line.split(",")[-1] for line in res.text.splitlines()[1:]] == ["900.00", "850.00", "860.00"]
+
+
+def test_transaction_listing_pages_through_archived_periods(admin_client, archived_month):
+    first = admin_client.get("/transactions", params={"limit": 2})
+    assert [(tx["id"], tx["amount"]) for tx in first.json()] == [(1, 100.0), (2, 50.0)]
+    rest = admin_client.get("/transactions", params={"limit": 2, "after": first.headers["X-Next-Cursor"]})
+    assert [tx["id"] for tx in rest.json()] == [3]
+
+    res = admin_client.get("/transactions", params={"format": "ndjson"})
+    assert [json.loads(line)["id"] for line in res.text.splitlines()] == [1, 2, 3]
+
+
+def test_archived_transactions_cannot_be_reversed(admin_client, archived_month):
+    res = admin_client.post("/transactions/1/reverse")
+    assert res.status_code == 409
+    assert res.json()["detail"] == "Transaction is archived in 2024_03 and can no longer be reversed"
+    assert admin_client.post("/transactions/99999/reverse").status_code == 404
+
+    res = admin_client.post("/transactions/reverse-batch", json={"ids": [2, 3]})
+    assert [(row["id"], row["status_code"]) for row in res.json()["results"]] == [(2, 409), (3, 200)]
+
+    res = admin_client.post("/transactions/reverse-batch", json={
+        "start": "2024-03-01T00:00:00", "end": "2100-01-01T00:00:00",
+    })
+    assert res.status_code == 409
+    assert "2024_03" in res.json()["detail"]
@@ -0,0 +1,94 @@
+import asyncio
+
+from app.core import ratelimit
+from app.core.config import settings
+
+
+def test_budget_spec_parsing():
+    assert ratelimit.parse_budget("20/50") == (20.0, 50.0)
+    assert ratelimit.parse_budget("5") == (5.0, 5.0)
+    assert ratelimit.parse_budget("0") is None
+    assert ratelimit.parse_budget("") is None
+
+
+def test_memory_bucket_allows_burst_then_reports_wait():
+    buckets = ratelimit.MemoryBuckets(maxsize=10)
+    assert [buckets.take("transactions:1", 2, 3) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert 0 < buckets.take("transactions:1", 2, 3) <= 0.5
+    assert buckets.take("transactions:2", 2, 3) == 0.0
+
+
+def test_sqlite_buckets_are_shared_between_instances(tmp_path):
+    path = str(tmp_path / "buckets.db")
+    first, second = ratelimit.SQLiteBuckets(path), ratelimit.SQLiteBuckets(path)
+    assert first.take("accounts:1", 1, 2) == 0.0
+    assert second.take("accounts:1", 1, 2) == 0.0
+    assert first.take("accounts:1", 1, 2) > 0
+
+
+def test_router_budget_returns_429_with_retry_after(admin_client, monkeypatch):
+    monkeypatch.setitem(ratelimit.budgets, "transactions", (0.001, 2))
+
+    assert admin_client.get("/transactions").status_code == 200
+    assert admin_client.get("/transactions").status_code == 200
+    response = admin_client.get("/transactions")
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # Other routers keep their own budget.
+    assert admin_client.get("/accounts").status_code == 200
+
+
+def test_unauthenticated_requests_are_not_counted(client, monkeypatch):
+    monkeypatch.setitem(ratelimit.budgets, "accounts", (0.001, 1))
+    for _ in range(3):
+        assert client.get("/accounts").status_code == 401
+
+
+def test_admission_sheds_requests_over_the_cap(monkeypatch):
+    monkeypatch.setattr(settings, "ADMISSION_MAX_IN_FLIGHT", 1)
+    monkeypatch.setattr(settings, "ADMISSION_QUEUE_SIZE", 1)
+    monkeypatch.setattr(settings, "ADMISSION_QUEUE_TIMEOUT_MS", 50)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = ratelimit.AdmissionMiddleware(slow_app)
+
+        async def call(path="/accounts"):
+            statuses = []
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    statuses.append(message["status"])
+
+            await middleware({"type": "http", "path": path}, None, send)
+            return statuses[0]
+
+        holder = asyncio.create_task(call())
+        queued = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        assert ratelimit.requests_in_flight() == 1
+        # The queue is full, so this one is shed without waiting.
+        assert await call() == 503
+        # A long poll on the event feed never takes a slot.
+        long_poll = asyncio.create_task(call("/events"))
+        await asyncio.sleep(0)
+        assert ratelimit.requests_in_flight() == 1
+        # The queued request times out before the slot frees up.
+        assert await queued == 503
+
+        queued = asyncio.create_task(call())
+        await asyncio.sleep(0)
+        release.set()
+        assert await holder == 200
+        assert await queued == 200
+        assert await long_poll == 200
+        assert ratelimit.requests_in_flight() == 0
+
+    asyncio.run(scenario())
@@ -1,5 +1,15 @@
+import asyncio
+import json
 from datetime import datetime, timedelta, UTC
 
+import httpx
+from sqlalchemy import select
+
+from app.main import app
+from app.core.config import settings
+from app.db import idempotency, models, posting
+from app.db.account_state import AccountState, account_states
+
 def test_create_deposit_transaction(non_admin_client, sender_account):
     res = non_admin_client.post("/transactions", json={
         "type": "deposit",
@@ -104,3 +114,288 @@ def test_filter_transactions_by_date(non_admin_client, sender_account, receiver_
     res = non_admin_client.get(f"/transactions/by-date?start={start}&end={end}")
     assert res.status_code == 200
     assert isinstance(res.json(), list)
+
+def test_list_transactions_paginates_with_cursor(non_admin_client, sender_account):
+    for amount in (10.0, 20.0, 30.0):
+        non_admin_client.post("/transactions", json={
+            "type": "deposit",
+            "amount": amount,
+            "recv_id": sender_account.id
+        })
+
+    first = non_admin_client.get("/transactions?limit=2")
+    assert first.status_code == 200
+    assert [tx["amount"] for tx in first.json()] == [10.0, 20.0]
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = non_admin_client.get(f"/transactions?limit=2&after={cursor}")
+    assert second.status_code == 200
+    assert [tx["amount"] for tx in second.json()] == [30.0]
+    assert "X-Next-Cursor" not in second.headers
+
+def test_list_transactions_invalid_cursor(non_admin_client):
+    res = non_admin_client.get("/transactions?after=not-a-cursor")
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Invalid cursor"
+
+def test_list_transactions_ndjson_stream(non_admin_client, sender_account):
+    for amount in (10.0, 20.0):
+        non_admin_client.post("/transactions", json={
+            "type": "deposit",
+            "amount": amount,
+            "recv_id": sender_account.id
+        })
+
+    res = non_admin_client.get("/transactions?format=ndjson")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in res.text.splitlines()]
+    assert [tx["amount"] for tx in lines] == [10.0, 20.0]
+
+def test_transfer_moves_balances(non_admin_client, sender_account, receiver_account):
+    res = non_admin_client.post("/transactions", json={
+        "type": "transfer",
+        "amount": 250.0,
+        "sender_id": sender_account.id,
+        "recv_id": receiver_account.id
+    })
+    assert res.status_code == 200
+
+    assert non_admin_client.get(f"/accounts/{sender_account.id}").json()["balance"] == 750.0
+    assert non_admin_client.get(f"/accounts/{receiver_account.id}").json()["balance"] == 1250.0
+
+def test_transfer_insufficient_funds(non_admin_client, sender_account, receiver_account):
+    res = non_admin_client.post("/transactions", json={
+        "type": "transfer",
+        "amount": 5000.0,
+        "sender_id": sender_account.id,
+        "recv_id": receiver_account.id
+    })
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Insufficient funds"
+    assert non_admin_client.get(f"/accounts/{sender_account.id}").json()["balance"] == 1000.0
+    assert non_admin_client.get(f"/accounts/{receiver_account.id}").json()["balance"] == 1000.0
+
+def test_transfer_to_missing_account_rolls_back(non_admin_client, sender_account):
+    res = non_admin_client.post("/transactions", json={
+        "type": "transfer",
+        "amount": 100.0,
+        "sender_id": sender_account.id,
+        "recv_id": 99999
+    })
+    assert res.status_code == 404
+    assert res.json()["detail"] == "Receiver account not found"
+    assert non_admin_client.get(f"/accounts/{sender_account.id}").json()["balance"] == 1000.0
+
+def test_reversal_restores_balances(admin_client, sender_account, receiver_account):
+    tx_id = admin_client.post("/transactions", json={
+        "type": "transfer",
+        "amount": 300.0,
+        "sender_id": sender_account.id,
+        "recv_id": receiver_account.id
+    }).json()["id"]
+
+    res = admin_client.post(f"/transactions/{tx_id}/reverse")
+    assert res.status_code == 200
+    assert admin_client.get(f"/accounts/{sender_account.id}").json()["balance"] == 1000.0
+    assert admin_client.get(f"/accounts/{receiver_account.id}").json()["balance"] == 1000.0
+
+    again = admin_client.post(f"/transactions/{tx_id}/reverse")
+    assert again.status_code == 400
+
+def test_cannot_reverse_a_reversal(admin_client, sender_account, receiver_account):
+    tx_id = admin_client.post("/transactions", json={
+        "type": "transfer",
+        "amount": 300.0,
+        "sender_id": sender_account.id,
+        "recv_id": receiver_account.id
+    }).json()["id"]
+    reversal_id = admin_client.post(f"/transactions/{tx_id}/reverse").json()["reversal"]["id"]
+
+    res = admin_client.post(f"/transactions/{reversal_id}/reverse")
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Cannot reverse a reversal transaction"
+
+def test_batch_posts_rows_and_reports_failures(non_admin_client, sender_account, receiver_account):
+    res = non_admin_client.post("/transactions/batch", json=[
+        {"type": "deposit", "amount": 100.0, "recv_id": sender_account.id},
+        {"type": "transfer", "amount": 1100.0, "sender_id": sender_account.id, "recv_id": receiver_account.id},
+        {"type": "transfer", "amount": 5000.0, "sender_id": sender_account.id, "recv_id": receiver_account.id},
+        {"type": "deposit", "amount": 10.0, "recv_id": 99999},
+        {"type": "withdrawal", "amount": -5.0, "sender_id": sender_account.id},
+        {"type": "deposit", "amount": "lots"},
+    ])
+    assert res.status_code == 200
+    data = res.json()
+    assert data["posted"] == 2
+    assert data["failed"] == 4
+    assert [row["status_code"] for row in data["results"]] == [200, 200, 400, 404, 400, 422]
+    assert data["results"][2]["detail"] == "Insufficient funds"
+    assert data["results"][0]["id"] is not None
+
+    assert non_admin_client.get(f"/accounts/{sender_account.id}").json()["balance"] == 0.0
+    assert non_admin_client.get(f"/accounts/{receiver_account.id}").json()["balance"] == 2100.0
+
+def test_batch_accepts_ndjson(non_admin_client, sender_account):
+    body = "\n".join(
+        json.dumps({"type": "deposit", "amount": amount, "recv_id": sender_account.id})
+        for amount in (1.0, 2.0, 3.0)
+    )
+    res = non_admin_client.post(
+        "/transactions/batch",
+        content=body,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert res.status_code == 200
+    assert res.json()["posted"] == 3
+    assert non_admin_client.get(f"/accounts/{sender_account.id}").json()["balance"] == 1006.0
+
+def test_batch_posts_each_chunk_while_the_body_is_still_arriving(non_admin_client, sender_account, monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_CHUNK_SIZE", 2)
+    post_batch = posting.post_batch
+    chunks = []
+    monkeypatch.setattr(posting, "post_batch", lambda db, items: chunks.append(len(items)) or post_batch(db, items))
+
+    def line(amount):
+        return json.dumps({"type": "deposit", "amount": amount, "recv_id": sender_account.id}).encode() + b"\n"
+
+    posted_before_rest = []
+
+    async def body():
+        yield line(1.0) + line(2.0)
+        posted_before_rest.extend(chunks)
+        yield line(3.0)
+
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post(
+                "/transactions/batch", content=body(),
+                headers={**non_admin_client.headers, "Content-Type": "application/x-ndjson"},
+            )
+
+    res = asyncio.run(send())
+    assert res.status_code == 200
+    assert res.json()["posted"] == 3
+    assert posted_before_rest == [2]
+    assert chunks == [2, 1]
+
+def test_batch_rejects_non_array_body(non_admin_client):
+    res = non_admin_client.post("/transactions/batch", json={"type": "deposit"})
+    assert res.status_code == 400
+
+def test_amounts_are_exact_minor_units(non_admin_client, sender_account):
+    for amount in (0.1, 0.2):
+        non_admin_client.post("/transactions", json={
+            "type": "deposit", "amount": amount, "recv_id": sender_account.id
+        })
+    assert non_admin_client.get(f"/accounts/{sender_account.id}").json()["balance"] == 1000.3
+
+    res = non_admin_client.post("/transactions", json={
+        "type": "deposit", "amount": 0.001, "recv_id": sender_account.id
+    })
+    assert res.status_code == 422
+
+def test_list_transactions_matches_schema_serialization(non_admin_client, sender_account):
+    created = non_admin_client.post("/transactions", json={
+        "type": "deposit", "amount": 12.34, "recv_id": sender_account.id
+    }).json()
+    assert non_admin_client.get("/transactions").json() == [created]
+
+def test_idempotency_key_replays_first_response(non_admin_client, sender_account, receiver_account):
+    payload = {"type": "transfer", "amount": 250.0, "sender_id": sender_account.id, "recv_id": receiver_account.id}
+    headers = {"Idempotency-Key": "transfer-1"}
+
+    first = non_admin_client.post("/transactions", json=payload, headers=headers)
+    assert first.status_code == 200
+    assert "Idempotent-Replayed" not in first.headers
+
+    idempotency.response_cache.clear()
+    retry = non_admin_client.post("/transactions", json=payload, headers=headers)
+    assert retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.json() == first.json()
+    assert non_admin_client.get(f"/accounts/{sender_account.id}").json()["balance"] == 750.0
+
+def test_idempotency_key_replays_errors_and_rejects_other_payloads(non_admin_client, sender_account, receiver_account):
+    payload = {"type": "transfer", "amount": 5000.0, "sender_id": sender_account.id, "recv_id": receiver_account.id}
+    headers = {"Idempotency-Key": "transfer-2"}
+
+    assert non_admin_client.post("/transactions", json=payload, headers=headers).status_code == 400
+    retry = non_admin_client.post("/transactions", json=payload, headers=headers)
+    assert retry.status_code == 400
+    assert retry.json()["detail"] == "Insufficient funds"
+
+    other = non_admin_client.post("/transactions", json={**payload, "amount": 10.0}, headers=headers)
+    assert other.status_code == 422
+    assert non_admin_client.get(f"/accounts/{sender_account.id}").json()["balance"] == 1000.0
+
+def test_purge_expired_drops_only_expired_keys(non_admin_client, db_session, sender_account):
+    payload = {"type": "deposit", "amount": 1.0, "recv_id": sender_account.id}
+    for key in ("old", "new"):
+        non_admin_client.post("/transactions", json=payload, headers={"Idempotency-Key": key})
+    old = db_session.scalars(select(models.IdempotencyKey).where(models.IdempotencyKey.key == "old")).one()
+    old.created_on = datetime.now(UTC) - timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS + 1)
+    db_session.commit()
+
+    assert idempotency.purge_expired(db_session) == 1
+    db_session.commit()
+    assert db_session.scalars(select(models.IdempotencyKey.key)).all() == ["new"]
+
+def test_inactive_accounts_are_rejected(admin_client, sender_account, receiver_account):
+    admin_client.patch(f"/accounts/{receiver_account.id}/toggle-active")
+    payload = {"type": "transfer", "amount": 10.0, "sender_id": sender_account.id, "recv_id": receiver_account.id}
+
+    res = admin_client.post("/transactions", json=payload)
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Receiver account is inactive"
+    assert account_states.get(receiver_account.id).is_active is False
+
+    admin_client.patch(f"/accounts/{receiver_account.id}/toggle-active")
+    assert admin_client.post("/transactions", json=payload).status_code == 200
+    assert admin_client.get(f"/accounts/{sender_account.id}").json()["balance"] == 990.0
+
+def test_stale_account_state_is_retried(non_admin_client, sender_account):
+    account_states.set(sender_account.id, AccountState(True, sender_account.version - 1))
+
+    res = non_admin_client.post("/transactions", json={"type": "deposit", "amount": 5.0, "recv_id": sender_account.id})
+    assert res.status_code == 200
+    assert account_states.get(sender_account.id).version == sender_account.version
+
+def test_reverse_batch_by_ids(admin_client, sender_account, receiver_account):
+    transfer = {"type": "transfer", "sender_id": sender_account.id, "recv_id": receiver_account.id}
+    first = admin_client.post("/transactions", json={**transfer, "amount": 100.0}).json()["id"]
+    second = admin_client.post("/transactions", json={**transfer, "amount": 200.0}).json()["id"]
+    reversed_before = admin_client.post(f"/transactions/{second}/reverse").json()["reversal"]["id"]
+
+    res = admin_client.post("/transactions/reverse-batch", json={"ids": [first, second, reversed_before, 99999]})
+    assert res.status_code == 200
+    data = res.json()
+    assert (data["reversed"], data["failed"]) == (1, 3)
+    assert [row["status_code"] for row in data["results"]] == [200, 400, 400, 404]
+    assert data["results"][1]["detail"] == "Transaction is already reversed"
+    assert data["results"][2]["detail"] == "Cannot reverse a reversal transaction"
+    assert admin_client.get(f"/accounts/{sender_account.id}").json()["balance"] == 1000.0
+    assert admin_client.get(f"/accounts/{receiver_account.id}").json()["balance"] == 1000.0
+
+def test_reverse_batch_by_filter_releases_unfunded_reversals(admin_client, sender_account, receiver_account):
+    admin_client.post("/transactions", json={"type": "deposit", "amount": 500.0, "recv_id": receiver_account.id})
+    spent = admin_client.post("/transactions", json={
+        "type": "transfer", "amount": 900.0, "sender_id": receiver_account.id, "recv_id": sender_account.id
+    }).json()["id"]
+    admin_client.post("/transactions", json={"type": "withdrawal", "amount": 1900.0, "sender_id": sender_account.id})
+
+    now = datetime.now(UTC)
+    res = admin_client.post("/transactions/reverse-batch", json={
+        "start": (now - timedelta(hours=1)).isoformat(), "end": (now + timedelta(hours=1)).isoformat(),
+        "account_id": sender_account.id,
+    })
+    data = res.json()
+    assert [row["status_code"] for row in data["results"]] == [400, 200]
+    assert data["results"][0]["id"] == spent
+    history = admin_client.get(f"/transactions/by-account/{sender_account.id}").json()
+    assert (history[0]["id"], history[0]["reversed"]) == (spent, False)
+    assert admin_client.get(f"/accounts/{sender_account.id}").json()["balance"] == 1900.0
+
+def test_reverse_batch_requires_admin_and_a_selection(admin_client, non_admin_client):
+    assert admin_client.post("/transactions/reverse-batch", json={}).status_code == 422
+    assert non_admin_client.post("/transactions/reverse-batch", json={"ids": [1]}).status_code == 403